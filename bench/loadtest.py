@@ -0,0 +1,203 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from collections import deque
+from datetime import date, datetime
+
+import numpy as np
+
+# Capacity check: drives main.py and the tools/ pages headlessly with AppTest, simulating
+# N patients (log in, step through the videos, finish, open the compare page) and M doctors
+# (log in, search the roster, page through it) against one server process. Up to
+# --concurrency sessions are open at once and take turns rerun by rerun; AppTest is not
+# thread-safe, so reruns are serialized, which matches GIL-bound script execution anyway.
+# Every rerun is timed; latency percentiles, RSS growth and throughput go to a JSON-lines report.
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+DEFAULT_OUT = "bench/loadtest.jsonl"
+PASSWORD = "pw"
+PERCENTILES = [50, 90, 99]
+
+
+def rss_mb():
+    # Current resident set size of this process (Linux), falling back to the peak
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = []  # (role, step, seconds)
+        self.errors = []
+        self.rss = [rss_mb()]
+
+    def timed(self, role, step, run):
+        started = time.perf_counter()
+        at = run()
+        self.samples.append((role, step, time.perf_counter() - started))
+        if at.exception:
+            self.errors.append(f"{role}/{step}: {at.exception[0].value}")
+        return at
+
+    def sample_rss(self):
+        self.rss.append(rss_mb())
+
+
+# Flows are generators that yield after every rerun so sessions can be interleaved
+
+def _login(rec, role, username, timeout):
+    from streamlit.testing.v1 import AppTest
+
+    at = rec.timed(role, "open", lambda: AppTest.from_file(APP, default_timeout=timeout).run())
+    yield
+    at.text_input(key="login_username").input(username)
+    at.text_input(key="login_password").input(PASSWORD)
+    at = rec.timed(role, "login", lambda: at.button[0].click().run())
+    yield
+    return at
+
+
+def patient_flow(rec, username, timeout):
+    at = yield from _login(rec, "patient", username, timeout)
+    at = rec.timed("patient", "instruction", lambda: at.switch_page("tools/instruction.py").run())
+    yield
+    for _ in range(20):
+        labels = [button.label for button in at.button]
+        if "Next" in labels:
+            at = rec.timed("patient", "next_video", lambda: at.button[labels.index("Next")].click().run())
+            yield
+        elif "Done" in labels:
+            at = rec.timed("patient", "done", lambda: at.button[labels.index("Done")].click().run())
+            yield
+            break
+        else:
+            break
+    rec.timed("patient", "compare", lambda: at.switch_page("tools/test.py").run())
+
+
+def doctor_flow(rec, username, timeout):
+    at = yield from _login(rec, "doctor", username, timeout)
+    at.sidebar.text_input(key="doctor_roster_query").input("patient1")
+    at = rec.timed("doctor", "roster_search", lambda: at.run())
+    yield
+    at.sidebar.text_input(key="doctor_roster_query").input("")
+    at = rec.timed("doctor", "roster_clear", lambda: at.run())
+    yield
+    pages = [w for w in at.sidebar.number_input if w.key == "doctor_roster_page"]
+    if pages:
+        rec.timed("doctor", "roster_page", lambda: pages[0].set_value(2).run())
+
+
+def run_flows(rec, flows, concurrency, timeout):
+    # Round-robin over at most `concurrency` open sessions, one rerun per turn
+    pending = deque(flows)
+    active = deque()
+    while pending or active:
+        while pending and len(active) < concurrency:
+            fn, username = pending.popleft()
+            active.append((username, fn(rec, username, timeout)))
+        username, flow = active.popleft()
+        try:
+            next(flow)
+        except StopIteration:
+            rec.sample_rss()
+            continue
+        except Exception as exc:  # keep the load going; failures are counted in the report
+            rec.errors.append(f"{username}: {exc!r}")
+            rec.sample_rss()
+            continue
+        active.append((username, flow))
+
+
+def seed_users(patients, doctors):
+    from rehab.users import UserStore
+
+    store = UserStore()
+    for d in range(doctors):
+        store.register_doctor(f"doctor{d}", PASSWORD, f"D{d}")
+    injuries = ["Rotator Cuff Tear", "Frozen Shoulder", "Dislocation"]
+    for p in range(patients):
+        store.register_patient(f"patient{p}", PASSWORD, f"D{p % doctors}", injuries[p % len(injuries)],
+                               30 + p % 50, "Other", date(2025, 1 + p % 12, 1))
+
+
+def summarize(rec, seconds):
+    steps = {}
+    for role, step, value in rec.samples:
+        steps.setdefault(f"{role}/{step}", []).append(value)
+    steps["all"] = [value for _, _, value in rec.samples]
+
+    def stats(values):
+        values = np.asarray(values) * 1000
+        return {"count": len(values), **{f"p{q}_ms": float(np.percentile(values, q)) for q in PERCENTILES},
+                "max_ms": float(values.max())}
+
+    return {
+        "seconds": seconds,
+        "reruns": len(rec.samples),
+        "reruns_per_s": len(rec.samples) / seconds if seconds > 0 else 0.0,
+        "errors": len(rec.errors),
+        "rss_start_mb": rec.rss[0],
+        "rss_end_mb": rec.rss[-1],
+        "rss_peak_mb": max(rec.rss),
+        "steps": {name: stats(values) for name, values in steps.items() if values},
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent patients and doctors against main.py.")
+    parser.add_argument("--patients", type=int, default=20)
+    parser.add_argument("--doctors", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=4, help="sessions open at the same time")
+    parser.add_argument("--timeout", type=float, default=120, help="per-rerun AppTest timeout (s)")
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="rehab-load-") as workdir:
+        # Fresh account and session stores; must be set before rehab modules are imported
+        os.environ["REHAB_USER_DB"] = os.path.join(workdir, "users.db")
+        os.environ["REHAB_SESSION_DIR"] = os.path.join(workdir, "sessions")
+        seed_users(args.patients, max(args.doctors, 1))
+
+        rec = Recorder()
+        flows = [(patient_flow, f"patient{p}") for p in range(args.patients)]
+        # Spread doctors through the patients so both roles run at the same time
+        for d in range(args.doctors):
+            flows.insert((d + 1) * len(flows) // (args.doctors + 1), (doctor_flow, f"doctor{d}"))
+
+        started = time.perf_counter()
+        run_flows(rec, flows, args.concurrency, args.timeout)
+        report = summarize(rec, time.perf_counter() - started)
+
+    from bench.run import git_commit  # imports rehab; only after REHAB_USER_DB is set
+
+    record = {"commit": git_commit(), "started": datetime.now().isoformat(timespec="seconds"),
+              "python": platform.python_version(), "machine": platform.machine(),
+              "patients": args.patients, "doctors": args.doctors, "concurrency": args.concurrency, **report}
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "a") as out:
+        out.write(json.dumps(record) + "\n")
+
+    print(f"{record['reruns']} reruns in {report['seconds']:.1f} s ({report['reruns_per_s']:.1f}/s), "
+          f"{report['errors']} errors, RSS {report['rss_start_mb']:.0f} -> {report['rss_end_mb']:.0f} MB "
+          f"(peak {report['rss_peak_mb']:.0f})")
+    for name, s in sorted(report["steps"].items()):
+        print(f"{name:24s} n={s['count']:<5d} p50 {s['p50_ms']:8.1f} ms  p90 {s['p90_ms']:8.1f} ms  "
+              f"p99 {s['p99_ms']:8.1f} ms  max {s['max_ms']:8.1f} ms")
+    for error in rec.errors[:10]:
+        print(f"error: {error}")
+    return 1 if rec.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from bench.synth import synth_monitor, synth_motion
+from rehab.figures import arm_figure, arm_frames
+from rehab.ingest import align_streams, read_monitor
+from rehab.kinematics import motion_segments
+from rehab.users import UserStore
+
+# Times the hot stages on synthetic recordings and appends one JSON line per
+# (stage, size) to a results file, so commits can be compared by number.
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_OUT = "bench/results.jsonl"
+STAGES = ["parse", "align", "kinematics", "frames", "figure", "users"]
+
+
+def timed(fn, repeat):
+    # Best wall time of `repeat` runs and the last result
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_parse(workdir, n, repeat):
+    monitor = synth_monitor(os.path.join(workdir, f"monitor-{n}.txt"), n)
+    motion = synth_motion(os.path.join(workdir, f"motion-{n}.csv"), n)
+    seconds, _ = timed(lambda: read_monitor(monitor), repeat)
+    yield "parse_monitor", seconds, {"bytes": os.path.getsize(monitor)}
+    seconds, _ = timed(lambda: pd.read_csv(motion), repeat)
+    yield "parse_motion", seconds, {"bytes": os.path.getsize(motion)}
+
+
+def bench_align(workdir, n, repeat):
+    # Three sensors at different rates and start offsets, like the HumeralMonitor files
+    streams = []
+    for k, (rate, offset) in enumerate([(100.0, 0.0), (60.0, 0.7), (80.0, 1.3)]):
+        path = synth_monitor(os.path.join(workdir, f"align-{n}-{k}.txt"), n, rate_hz=rate,
+                             start=17 * 3600 + offset, seed=k)
+        streams.append(read_monitor(path))
+    seconds, (grid, _) = timed(lambda: align_streams(streams, rate_hz=100.0), repeat)
+    yield "align", seconds, {"output_samples": len(grid)}
+
+
+def bench_kinematics(workdir, n, repeat):
+    columns = pd.read_csv(synth_motion(os.path.join(workdir, f"motion-{n}.csv"), n))
+    seconds, _ = timed(lambda: motion_segments(columns), repeat)
+    yield "kinematics", seconds, {}
+
+
+def _segments(n):
+    rng = np.random.default_rng(0)
+    p1 = rng.normal(size=(n, 3))
+    return p1, p1 + rng.normal(size=(n, 3))
+
+
+def bench_frames(workdir, n, repeat):
+    p1, p2 = _segments(n)
+    seconds, _ = timed(lambda: arm_frames(p1, p2), repeat)
+    yield "frames", seconds, {}
+
+
+def bench_figure(workdir, n, repeat):
+    p1, p2 = _segments(n)
+    fig = arm_figure(p1, p2, "bench")
+    seconds, payload = timed(fig.to_json, repeat)
+    yield "figure_json", seconds, {"bytes": len(payload)}
+
+
+def bench_users(workdir, n, repeat):
+    # Registration and login against a fresh store holding n accounts
+    store = UserStore(os.path.join(workdir, f"users-{n}.db"), legacy_json=None)
+    doctors = max(n // 100, 1)
+    started = time.perf_counter()
+    for d in range(doctors):
+        store.register_doctor(f"doctor{d}", "pw", f"D{d}")
+    for p in range(n - doctors):
+        store.register_patient(f"patient{p}", "pw", f"D{p % doctors}", "Frozen Shoulder", 40, "Other", "2025-03-13")
+    yield "users_register", (time.perf_counter() - started) / n, {"per": "operation"}
+
+    rng = np.random.default_rng(0)
+    names = [f"patient{p}" for p in rng.integers(0, max(n - doctors, 1), 1000)]
+    seconds, _ = timed(lambda: [store.get(name) for name in names], repeat)
+    yield "users_login", seconds / len(names), {"per": "operation"}
+
+
+BENCHES = {
+    "parse": bench_parse,
+    "align": bench_align,
+    "kinematics": bench_kinematics,
+    "frames": bench_frames,
+    "figure": bench_figure,
+    "users": bench_users,
+}
+
+# Stages that build Plotly objects per sample or write one row per account are capped
+SIZE_LIMITS = {"frames": 10_000, "figure": 10_000, "users": 1_000_000}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark parsing, alignment, figures and the user store.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", default=DEFAULT_OUT)
+    parser.add_argument("--no-limits", action="store_true", help="run every stage at every size")
+    args = parser.parse_args(argv)
+
+    run = {"commit": git_commit(), "started": datetime.now().isoformat(timespec="seconds"),
+           "python": platform.python_version(), "numpy": np.__version__, "machine": platform.machine()}
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with tempfile.TemporaryDirectory(prefix="rehab-bench-") as workdir, open(args.out, "a") as out:
+        for n in args.sizes:
+            for stage in args.stages:
+                if not args.no_limits and n > SIZE_LIMITS.get(stage, n):
+                    continue
+                for name, seconds, extra in BENCHES[stage](workdir, n, args.repeat):
+                    record = {**run, "stage": name, "n": n, "seconds": seconds, **extra}
+                    out.write(json.dumps(record) + "\n")
+                    out.flush()
+                    print(f"{name:16s} n={n:<10d} {seconds * 1000:12.3f} ms  {json.dumps(extra)}", flush=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+from rehab import quaternion
+from rehab.kinematics import HUMERUS_COLUMNS, RADIUS_COLUMNS
+
+# Synthetic recordings in the doc/ formats, reproducible from a seed.
+
+
+def smooth_quaternions(n, seed=0):
+    # Smooth rotation path: slerp between sparse random key rotations
+    rng = np.random.default_rng(seed)
+    n_keys = max(n // 50, 2)
+    keys = quaternion.normalize(rng.normal(size=(n_keys, 4)))
+    pos = np.linspace(0, n_keys - 1, n)
+    i = np.minimum(pos.astype(int), n_keys - 2)
+    return quaternion.slerp(keys[i], keys[i + 1], pos - i)
+
+
+def clock_strings(t):
+    # Seconds since midnight -> "HH:MM:SS.m" with the unpadded millisecond field of the real files
+    t = np.asarray(t)
+    whole = t.astype(np.int64)
+    ms = np.round((t - whole) * 1000).astype(np.int64)
+    whole, ms = whole + ms // 1000, ms % 1000
+    h, m, s = whole // 3600 % 24, whole // 60 % 60, whole % 60
+    parts = [pd.Series(v).astype(str) for v in (h, m, s, ms)]
+    return (parts[0].str.zfill(2) + ":" + parts[1].str.zfill(2) + ":" + parts[2].str.zfill(2)
+            + "." + parts[3]).to_numpy()
+
+
+def synth_monitor(path, n, rate_hz=100.0, start=17 * 3600 + 48 * 60, jitter=0.2, seed=0):
+    # HumeralMonitor text file: "time x y z w", two decimals, irregular sampling
+    rng = np.random.default_rng(seed)
+    dt = (1.0 + rng.uniform(-jitter, jitter, n)) / rate_hz
+    t = start + np.cumsum(dt)
+    q = smooth_quaternions(n, seed)
+    df = pd.DataFrame({"time": clock_strings(t), "x": q[:, 1], "y": q[:, 2], "z": q[:, 3], "w": q[:, 0]})
+    df.to_csv(path, sep=" ", header=False, index=False, float_format="%.2f")
+    return path
+
+
+def synth_motion(path, n, rate_hz=10.0, seed=0):
+    # motion_data.csv: humerus and radius quaternions plus a Rotation_Angle with repetitions
+    rng = np.random.default_rng(seed)
+    humerus = smooth_quaternions(n, seed)
+    radius = smooth_quaternions(n, seed + 1)
+    t = np.arange(n) / rate_hz
+    angle = 135 + 40 * np.sin(2 * np.pi * t / 8.0) + rng.normal(0, 0.5, n)
+    df = pd.DataFrame(np.column_stack([humerus, radius, angle]),
+                      columns=HUMERUS_COLUMNS + RADIUS_COLUMNS + ["Rotation_Angle"])
+    df.to_csv(path, index=False, float_format="%.3f")
+    return path
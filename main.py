@@ -1,33 +1,22 @@
 import streamlit as st
 from datetime import date
-import json
 
-# User data file
-USER_DATA_FILE = "user_data.json"
+from rehab import jobs, metrics
+from rehab.progress import ProgressStore
+from rehab.roster import patient_roster
+from rehab.users import UserStore, UserExistsError, UnknownDoctorError
 
-# Load user data
-def load_users():
-    try:
-        with open(USER_DATA_FILE, "r") as file:
-            users = json.load(file)
-            for user in users:
-                if "start_date" in users[user] and users[user]["start_date"]:
-                    users[user]["start_date"] = date.fromisoformat(users[user]["start_date"])
-            return users
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {}
+# User database (SQLite, migrated once from user_data.json)
+@st.cache_resource
+def get_user_store():
+    return UserStore()
 
-# Save user data
-def save_users(users):
-    with open(USER_DATA_FILE, "w") as file:
-        users_serializable = {
-            user: {**data, "start_date": str(data["start_date"]) if "start_date" in data and data["start_date"] else None}
-            for user, data in users.items()
-        }
-        json.dump(users_serializable, file, indent=4)
+@st.cache_resource
+def get_progress_store():
+    return ProgressStore()
 
-# Initialize user database
-users = load_users()
+users = get_user_store()
+progress = get_progress_store()
 
 # Login function
 def login():
@@ -36,9 +25,11 @@ def login():
     password = st.text_input("Password", type="password", key="login_password")
     
     if st.button("Login"):
-        if username in users and users[username]["password"] == password:
+        with metrics.stage("users.get"):
+            user = users.get(username)
+        if user and user["password"] == password:
             st.session_state.logged_in = True
-            st.session_state.user_data = users[username]
+            st.session_state.user_data = user
             st.success("Login successful!")
             st.rerun()
         else:
@@ -62,39 +53,21 @@ def register():
         doctor_id = st.text_input("Doctor ID", key="reg_doctor_id")
     
     if st.button("Register"):
-        if username and password and username not in users:
-            if role == "Patient":
-                valid_doctor = any(user for user in users if users[user]["role"] == "Doctor" and users[user]["doctor_id"] == doctor_id)
-                if not valid_doctor:
-                    st.error("Doctor ID not found. Please enter a valid Doctor ID.")
-                    return
-                users[username] = {
-                    "password": password,
-                    "role": role,
-                    "doctor_id": doctor_id,
-                    "injury_type": injury_type,
-                    "age": age,
-                    "gender": gender,
-                    "start_date": str(start_date)
-                }
-                for user in users:
-                    if users[user]["role"] == "Doctor" and users[user]["doctor_id"] == doctor_id:
-                        if "patients" not in users[user]:
-                            users[user]["patients"] = []
-                        users[user]["patients"].append(username)
-            else:
-                users[username] = {
-                    "password": password,
-                    "role": role,
-                    "doctor_id": doctor_id,
-                    "patients": []
-                }
-            save_users(users)
-            st.success("Registration successful! You can now log in.")
-        elif username in users:
+        if not (username and password):
+            st.error("Please fill in all fields.")
+            return
+        try:
+            with metrics.stage("users.register"):
+                if role == "Patient":
+                    users.register_patient(username, password, doctor_id, injury_type, age, gender, start_date)
+                else:
+                    users.register_doctor(username, password, doctor_id)
+        except UserExistsError:
             st.error("Username already exists. Please choose a different one.")
+        except UnknownDoctorError:
+            st.error("Doctor ID not found. Please enter a valid Doctor ID.")
         else:
-            st.error("Please fill in all fields.")
+            st.success("Registration successful! You can now log in.")
 
 # Logout function
 def logout():
@@ -106,6 +79,33 @@ def logout():
         st.success("Logged out successfully.")
         st.rerun()
 
+# Doctor view: patient info and progress
+def doctor_view():
+    # The roster is queried per rerun and only returns this doctor's patients, so patients who
+    # registered after login show up and nobody else's records can be selected
+    st.sidebar.title("Your Patients - Info")
+    with metrics.stage("users.roster"):
+        patient_data = patient_roster(users, st.session_state.user_data["username"], "doctor_roster", st.sidebar)
+    if patient_data:
+        selected_patient = patient_data["username"]
+        st.write(f"### Patient: {selected_patient}")
+        st.write(f"**Injury Type:** {patient_data['injury_type']}")
+        st.write(f"**Age:** {patient_data['age']}")
+        st.write(f"**Gender:** {patient_data['gender']}")
+        st.write(f"**Rehabilitation Start Date:** {patient_data['start_date']}")
+        daily = progress.daily(selected_patient)
+        if daily:
+            st.line_chart({"day": [d["day"] for d in daily], "Mean ROM": [d["mean_rom"] for d in daily]}, x="day", y="Mean ROM")
+
+    st.sidebar.title("Your Patients - Progress")
+    st.write("### Your Patients - Progress")
+    with metrics.stage("progress.doctor_table"):
+        rows = progress.doctor_table(st.session_state.user_data["username"])
+    st.dataframe(rows, hide_index=True)
+    page = st.sidebar.radio("Go to", ["Log out"])
+    if page == "Log out":
+        logout()
+
 # Page objects (for navigation compatibility if needed)
 login_page = st.Page(login, title="Log in", icon=":material/login:")
 logout_page = st.Page(logout, title="Log out", icon=":material/logout:")
@@ -117,25 +117,18 @@ if "logged_in" not in st.session_state:
     st.session_state.logged_in = False
     st.session_state.user_data = None
 
-# Main interface after login
+# Main interface after login (each rerun is timed per page and role). With REHAB_PROFILE=1 on
+# the server, ?profile=1 profiles the next rerun of a signed-in user; the parameter is then
+# dropped from the URL so later reruns run unprofiled
+profile = st.query_params.get("profile") == "1" and st.session_state.logged_in
+if "profile" in st.query_params:
+    del st.query_params["profile"]
 if st.session_state.logged_in:
     if st.session_state.user_data["role"] == "Doctor":
-        if "patients" in st.session_state.user_data:
-            st.sidebar.title("Your Patients - Info")
-            selected_patient = st.sidebar.radio("Select a patient", st.session_state.user_data["patients"])
-            if selected_patient in users:
-                patient_data = users[selected_patient]
-                st.write(f"### Patient: {selected_patient}")
-                st.write(f"**Injury Type:** {patient_data['injury_type']}")
-                st.write(f"**Age:** {patient_data['age']}")
-                st.write(f"**Gender:** {patient_data['gender']}")
-                st.write(f"**Rehabilitation Start Date:** {patient_data['start_date']}")
-                
-        st.sidebar.title("Your Patients - Progress")
-        page = st.sidebar.radio("Go to", ["Log out"])
-        if page == "Log out":
-            logout()
-    
+        jobs.enter_page("doctor")
+        with metrics.rerun("doctor", "Doctor", profile):
+            doctor_view()
+
     elif st.session_state.user_data["role"] == "Patient":
         page = st.navigation(
             {
@@ -143,12 +136,16 @@ if st.session_state.logged_in:
                 "Tools": [instruction,compare],
             }
         )
-        page.run()
+        jobs.enter_page(page.title)  # leaving a page cancels its background jobs
+        with metrics.rerun(page.title, "Patient", profile):
+            page.run()
 
 # Interface before login
 else:
     option = st.radio("Please choose an action", ["Login", "Register"])
-    if option == "Login":
-        login()
-    else:
-        register()
+    jobs.enter_page(option)
+    with metrics.rerun(option, "anonymous", profile):
+        if option == "Login":
+            login()
+        else:
+            register()
@@ -0,0 +1 @@
+"""Shared helpers for the rehabilitation app pages."""
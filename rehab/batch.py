@@ -0,0 +1,231 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+
+from rehab import reps
+from rehab.ingest import align_streams, read_monitor
+from rehab.kinematics import HUMERUS_COLUMNS, RADIUS_COLUMNS, motion_segments, segment_directions
+
+# Offline reprocessing of archived recordings: every input is hashed and re-derived in a
+# worker process, and outputs whose input hash and FEATURE_VERSION are unchanged are skipped.
+# Bump FEATURE_VERSION whenever a derived feature below changes.
+FEATURE_VERSION = 1
+OUT_DIR = ".cache/features"
+INDEX_FILE = "index.json"
+ALIGN_RATE_HZ = 10.0
+HASH_CHUNK = 1 << 20
+SNIFF_BYTES = 4096
+# "HH:MM:SS.mmm x y z w"
+MONITOR_LINE = re.compile(r"^\d{1,2}:\d{2}:\d{2}(\.\d+)?( -?\d+(\.\d*)?([eE][-+]?\d+)?){4}$")
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def recording_kind(path):
+    # "monitor", "motion" or None, from the file's first line rather than its extension
+    if not path.endswith((".txt", ".csv")):
+        return None
+    try:
+        with open(path, "r", errors="replace") as file:
+            first = file.readline(SNIFF_BYTES).strip()
+    except OSError:
+        return None
+    if path.endswith(".txt"):
+        return "monitor" if MONITOR_LINE.match(first) else None
+    columns = {name.strip() for name in first.split(",")}
+    return "motion" if columns.issuperset(HUMERUS_COLUMNS + RADIUS_COLUMNS) else None
+
+
+def monitor_features(path):
+    t, q = read_monitor(path)
+    return {"t": t, "q": q, "direction": segment_directions(q)}
+
+
+def motion_features(path):
+    df = pd.read_csv(path)
+    p1, p2 = motion_segments(df)
+    features = {"p1": p1, "p2": p2}
+    if "Rotation_Angle" in df:
+        angle = df["Rotation_Angle"].to_numpy(dtype=float)
+        summary = reps.summarize(reps.detect_reps(angle))
+        features["angle_stats"] = np.array([angle.mean(), angle.std(), angle.min(), angle.max()])
+        features.update({f"rep_{name}": np.array(value) for name, value in summary.items()})
+    return features
+
+
+def alignment_features(paths):
+    streams = [read_monitor(path) for path in paths]
+    try:
+        grid, quats = align_streams(streams, ALIGN_RATE_HZ)
+        relative = False
+    except ValueError:
+        # Sensors recorded at different times: align on elapsed time instead
+        grid, quats = align_streams(streams, ALIGN_RATE_HZ, relative=True)
+        relative = True
+    features = {"grid": grid, "relative": np.array(relative)}
+    features.update({f"q{i}": q for i, q in enumerate(quats)})
+    return features
+
+
+def _save(target, features):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp = f"{target}.{os.getpid()}.tmp.npz"
+    np.savez(tmp, **features)
+    os.replace(tmp, target)
+
+
+def _samples(features):
+    return max(len(v) for v in features.values() if v.ndim)
+
+
+def run_job(job, previous, out_dir, force):
+    # Runs in a worker: hashing happens here too so the parent never reads input files
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    paths = job["inputs"]
+    digest = hashlib.sha256(f"{FEATURE_VERSION}|{job['kind']}".encode())
+    size = 0
+    for path in paths:
+        digest.update(file_hash(path).encode())
+        size += os.path.getsize(path)
+    digest = digest.hexdigest()
+    target = os.path.join(out_dir, job["output"])
+    result = {"key": job["key"], "hash": digest, "output": job["output"], "bytes": size, "samples": 0}
+    if not force and previous == digest and os.path.exists(target):
+        result["skipped"] = True
+    else:
+        if job["kind"] == "align":
+            features = alignment_features(paths)
+        elif job["kind"] == "monitor":
+            features = monitor_features(paths[0])
+        else:
+            features = motion_features(paths[0])
+        _save(target, features)
+        result["skipped"] = False
+        result["samples"] = _samples(features)
+    result["seconds"] = time.perf_counter() - started
+    result["cpu"] = time.process_time() - cpu_started
+    return result
+
+
+def discover(root):
+    # One job per recording, plus one alignment job per directory holding two or more monitor
+    # files. Files that do not look like a recording are left out.
+    jobs = []
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+        rel_dir = os.path.relpath(directory, root)
+        monitors = []
+        for name in sorted(files):
+            path = os.path.join(directory, name)
+            kind = recording_kind(path)
+            if kind is None:
+                continue
+            rel = os.path.normpath(os.path.join(rel_dir, name))
+            jobs.append({"key": rel, "kind": kind, "inputs": [path], "output": rel + ".npz"})
+            if kind == "monitor":
+                monitors.append(path)
+        if len(monitors) > 1:
+            rel = os.path.normpath(os.path.join(rel_dir, "aligned"))
+            jobs.append({"key": rel + "/", "kind": "align", "inputs": monitors, "output": rel + ".npz"})
+    return jobs
+
+
+def _load_index(out_dir):
+    path = os.path.join(out_dir, INDEX_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def _save_index(out_dir, index):
+    path = os.path.join(out_dir, INDEX_FILE)
+    with open(path + ".tmp", "w") as file:
+        json.dump(index, file, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+
+def reprocess(root, out_dir=OUT_DIR, workers=None, force=False):
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(out_dir, exist_ok=True)
+    index = _load_index(out_dir)
+    jobs = discover(root)
+    # Largest inputs first so one big file does not finish last on an otherwise idle pool
+    jobs.sort(key=lambda job: -sum(os.path.getsize(p) for p in job["inputs"]))
+
+    started = time.perf_counter()
+    results = []
+    failed = {}
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(run_job, job, index.get(job["key"], {}).get("hash"), out_dir, force): job
+                for job in jobs
+            }
+            for future in as_completed(futures):
+                job = futures[future]
+                try:
+                    result = future.result()
+                except Exception as exc:  # one bad input must not abort the run
+                    # No hash, so the job is retried next time
+                    failed[job["key"]] = f"{type(exc).__name__}: {exc}"
+                    index[job["key"]] = {"error": failed[job["key"]], "output": job["output"]}
+                    continue
+                index[result["key"]] = {"hash": result["hash"], "output": result["output"]}
+                results.append(result)
+    finally:
+        # Drop entries whose inputs have disappeared; saved even if the run is interrupted
+        live = {job["key"] for job in jobs}
+        for key in [key for key in index if key not in live]:
+            del index[key]
+        _save_index(out_dir, index)
+    elapsed = time.perf_counter() - started
+
+    done = [r for r in results if not r["skipped"]]
+    cpu = sum(r["cpu"] for r in results)
+    return {
+        "jobs": len(results) + len(failed),
+        "processed": len(done),
+        "skipped": len(results) - len(done),
+        "failed": failed,
+        "workers": workers,
+        "seconds": elapsed,
+        "bytes": sum(r["bytes"] for r in results),
+        "samples": sum(r["samples"] for r in done),
+        "cpu": cpu,
+        # 1.0 means every worker was busy for the whole run
+        "efficiency": cpu / (elapsed * workers) if elapsed > 0 else 0.0,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute derived features for archived recordings in parallel.")
+    parser.add_argument("root", help="directory tree of HumeralMonitor .txt and motion .csv files")
+    parser.add_argument("--out", default=OUT_DIR, help="output directory for .npz features and the hash index")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--force", action="store_true", help="recompute even if inputs are unchanged")
+    args = parser.parse_args()
+    report = reprocess(args.root, args.out, args.workers, args.force)
+    seconds = max(report["seconds"], 1e-9)
+    print(f"{report['jobs']} jobs: {report['processed']} processed, {report['skipped']} skipped, "
+          f"{len(report['failed'])} failed with {report['workers']} workers in {report['seconds']:.2f} s")
+    print(f"throughput: {report['jobs'] / seconds:.1f} jobs/s, {report['bytes'] / seconds / 1e6:.1f} MB/s, "
+          f"{report['samples'] / seconds:.0f} samples/s; parallel efficiency {report['efficiency']:.0%}")
+    for key, error in sorted(report["failed"].items()):
+        print(f"failed: {key}: {error}")
+    if report["failed"]:
+        raise SystemExit(1)
@@ -0,0 +1,92 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from rehab.ingest import read_monitor
+
+# Text recordings are converted once into one .npy file per column and then opened
+# memory-mapped read-only, so every session and worker process shares the same pages.
+CACHE_DIR = os.environ.get("REHAB_CACHE_DIR", ".cache/recordings")
+FORMAT_VERSION = 1
+
+_open = {}
+_lock = threading.Lock()
+
+
+def _digest(text, length):
+    return hashlib.sha1(text.encode()).hexdigest()[:length]
+
+
+def _entry_dir(path, kind):
+    # Keyed by path, size and mtime: editing the source file yields a new entry
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    prefix = f"{os.path.basename(path)}-{_digest(path, 8)}-{kind}"
+    version = _digest(f"{FORMAT_VERSION}|{stat.st_size}|{stat.st_mtime_ns}", 12)
+    return prefix, os.path.join(CACHE_DIR, f"{prefix}-{version}")
+
+
+def _write_entry(entry, columns):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=CACHE_DIR, prefix=".tmp-")
+    try:
+        for name, values in columns.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(values))
+        os.rename(tmp, entry)
+    except OSError:
+        # Another process finished the same entry first
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.isdir(entry):
+            raise
+
+
+def _prune(prefix, keep):
+    for name in os.listdir(CACHE_DIR):
+        stale = os.path.join(CACHE_DIR, name)
+        if name.startswith(prefix + "-") and stale != keep:
+            shutil.rmtree(stale, ignore_errors=True)
+            _open.pop(stale, None)
+
+
+def open_columns(path, kind, parse):
+    # parse(path) -> {column name: ndarray}; only called when no valid entry exists
+    prefix, entry = _entry_dir(path, kind)
+    with _lock:
+        if entry in _open:
+            return _open[entry]
+        if not os.path.isdir(entry):
+            _write_entry(entry, parse(path))
+            _prune(prefix, entry)
+        columns = {
+            name[:-4]: np.load(os.path.join(entry, name), mmap_mode="r")
+            for name in sorted(os.listdir(entry))
+            if name.endswith(".npy")
+        }
+        _open[entry] = columns
+        return columns
+
+
+def _parse_monitor(path):
+    t, q = read_monitor(path)
+    return {"t": t, "q": q}
+
+
+def _parse_table(path):
+    df = pd.read_csv(path)
+    return {name: df[name].to_numpy(dtype=float) for name in df.columns}
+
+
+def load_monitor(path):
+    # HumeralMonitor file -> (t, q) memory-mapped arrays
+    columns = open_columns(path, "monitor", _parse_monitor)
+    return columns["t"], columns["q"]
+
+
+def load_table(path):
+    # Numeric CSV such as motion_data.csv -> {column: memory-mapped array}
+    return open_columns(path, "table", _parse_table)
@@ -0,0 +1,240 @@
+import argparse
+import os
+import struct
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from rehab.ingest import read_monitor
+from rehab.kinematics import HUMERUS_COLUMNS, RADIUS_COLUMNS
+
+# Compact binary format for quaternion streams (.rqc), replacing ~30 bytes of text per sample.
+# Each sample is one uint32: "smallest three" packing keeps the index of the largest |component|
+# (2 bits) and the other three components quantized to BITS each (the dropped one is rebuilt from
+# the unit norm, sign chosen positive since q and -q are the same rotation). Timestamps are
+# integer milliseconds, stored per block as a start time plus int16 deltas; a gap too long for
+# int16 starts a new block. Samples are grouped into blocks, optionally zlib-compressed, and a
+# block index at the end of the file gives random access by block number or time.
+#
+# Layout: header | block payloads | index | footer
+#   header:  MAGIC, version u8, flags u8, bits u8
+#   payload: deltas (n - 1 x int16) + packed quaternions (n x uint32), zlib'd if compressed
+#   index:   per block: offset u64, length u32, samples u32, t0 ms i64, t1 ms i64
+#   footer:  index offset u64, block count u32, MAGIC
+MAGIC = b"RQC1"
+VERSION = 1
+FLAG_ZLIB = 1
+BITS = 10
+BLOCK_SIZE = 1024
+MOTION_RATE_HZ = 10.0  # motion_data.csv has no timestamps
+
+_HEADER = struct.Struct("<4sBBB")
+_INDEX = struct.Struct("<QIIqq")
+_FOOTER = struct.Struct("<QI4s")
+_SCALE = np.sqrt(0.5)  # the three smaller components lie in [-1/sqrt(2), 1/sqrt(2)]
+_MAX_DELTA = (1 << 15) - 1
+MIN_BITS, MAX_BITS = 2, 10  # 2 index bits + 3 x bits must fit the uint32
+
+
+def _check_bits(bits):
+    if not MIN_BITS <= bits <= MAX_BITS:
+        raise ValueError(f"bits must be between {MIN_BITS} and {MAX_BITS}, got {bits}")
+
+
+def pack_quaternions(q, bits=BITS):
+    # (N, 4) w-first quaternions -> (N,) uint32; input need not be normalized
+    _check_bits(bits)
+    q = np.asarray(q, dtype=float)
+    q = q / np.linalg.norm(q, axis=1, keepdims=True)
+    largest = np.argmax(np.abs(q), axis=1)
+    rows = np.arange(len(q))
+    q = q * np.where(q[rows, largest] < 0, -1.0, 1.0)[:, None]
+    # The three remaining components, in their original order
+    keep = np.sort(np.argsort(np.arange(4)[None, :] == largest[:, None], axis=1, kind="stable")[:, :3], axis=1)
+    small = np.take_along_axis(q, keep, axis=1)
+    levels = (1 << bits) - 2  # even, so 0 is exactly representable
+    quantized = np.rint((np.clip(small, -_SCALE, _SCALE) + _SCALE) / (2 * _SCALE) * levels).astype(np.uint32)
+    return ((largest.astype(np.uint32) << (3 * bits))
+            | (quantized[:, 0] << (2 * bits)) | (quantized[:, 1] << bits) | quantized[:, 2])
+
+
+def unpack_quaternions(packed, bits=BITS):
+    # (N,) uint32 -> (N, 4) unit w-first quaternions
+    _check_bits(bits)
+    packed = np.asarray(packed, dtype=np.uint32)
+    mask = np.uint32((1 << bits) - 1)
+    largest = (packed >> (3 * bits)).astype(np.intp)
+    small = np.column_stack([(packed >> (2 * bits)) & mask, (packed >> bits) & mask, packed & mask])
+    small = small.astype(float) / float(mask - 1) * (2 * _SCALE) - _SCALE
+    q = np.empty((len(packed), 4))
+    keep = np.sort(np.argsort(np.arange(4)[None, :] == largest[:, None], axis=1, kind="stable")[:, :3], axis=1)
+    np.put_along_axis(q, keep, small, axis=1)
+    q[np.arange(len(packed)), largest] = np.sqrt(np.clip(1.0 - np.sum(small ** 2, axis=1), 0.0, None))
+    return q
+
+
+def _block_starts(t_ms, block_size):
+    # Every block_size samples, plus wherever a delta does not fit in int16
+    if len(t_ms) == 0:
+        return [0]
+    gaps = np.flatnonzero(np.abs(np.diff(t_ms)) > _MAX_DELTA) + 1
+    starts = [0]
+    for gap in list(gaps) + [len(t_ms)]:
+        starts.extend(range(starts[-1] + block_size, gap, block_size))
+        starts.append(int(gap))
+    return starts
+
+
+def encode(t, q, block_size=BLOCK_SIZE, compress=False, bits=BITS):
+    # t: (N,) seconds in non-decreasing order, q: (N, 4) w-first -> bytes
+    t_ms = np.rint(np.asarray(t, dtype=float) * 1000).astype(np.int64)
+    if len(t_ms) != len(q):
+        raise ValueError("t and q must have the same length")
+    # The block index is searched by start time, so blocks must be in time order
+    if np.any(np.diff(t_ms) < 0):
+        raise ValueError("timestamps must be sorted in non-decreasing order")
+    packed = pack_quaternions(q, bits)
+    parts = [_HEADER.pack(MAGIC, VERSION, FLAG_ZLIB if compress else 0, bits)]
+    offset = len(parts[0])
+    index = []
+    starts = _block_starts(t_ms, block_size)
+    for start, end in zip(starts, starts[1:]):
+        block_t = t_ms[start:end]
+        payload = np.diff(block_t).astype("<i2").tobytes() + packed[start:end].astype("<u4").tobytes()
+        if compress:
+            payload = zlib.compress(payload, 6)
+        index.append(_INDEX.pack(offset, len(payload), len(block_t), block_t[0], block_t[-1]))
+        parts.append(payload)
+        offset += len(payload)
+    parts.extend(index)
+    parts.append(_FOOTER.pack(offset, len(index), MAGIC))
+    return b"".join(parts)
+
+
+class Reader:
+    # Random access over an encoded stream (bytes, or a path that is memory-mapped)
+    def __init__(self, data):
+        if isinstance(data, (str, os.PathLike)):
+            data = np.memmap(data, dtype=np.uint8, mode="r")
+        self.data = memoryview(data).cast("B")
+        magic, version, flags, self.bits = _HEADER.unpack_from(self.data, 0)
+        index_offset, n_blocks, end_magic = _FOOTER.unpack_from(self.data, len(self.data) - _FOOTER.size)
+        if magic != MAGIC or end_magic != MAGIC or version != VERSION:
+            raise ValueError("not a quaternion stream (.rqc) file")
+        self.compressed = bool(flags & FLAG_ZLIB)
+        self.index = [_INDEX.unpack_from(self.data, index_offset + i * _INDEX.size) for i in range(n_blocks)]
+        self.block_starts = np.array([entry[3] for entry in self.index], dtype=np.int64)
+
+    def __len__(self):
+        return sum(entry[2] for entry in self.index)
+
+    @property
+    def n_blocks(self):
+        return len(self.index)
+
+    def block(self, i):
+        # -> (t seconds, q) for block i
+        offset, length, n, t0, _ = self.index[i]
+        payload = bytes(self.data[offset:offset + length])
+        if self.compressed:
+            payload = zlib.decompress(payload)
+        deltas = np.frombuffer(payload, dtype="<i2", count=n - 1)
+        t_ms = np.empty(n, dtype=np.int64)
+        t_ms[0] = t0
+        np.cumsum(deltas, out=t_ms[1:])
+        t_ms[1:] += t0
+        packed = np.frombuffer(payload, dtype="<u4", count=n, offset=(n - 1) * 2)
+        return t_ms / 1000.0, unpack_quaternions(packed, self.bits)
+
+    def find(self, t):
+        # Index of the block holding time t (seconds)
+        return max(int(np.searchsorted(self.block_starts, int(round(t * 1000)), side="right")) - 1, 0)
+
+    def read(self, t0=None, t1=None):
+        # Samples with t0 <= t <= t1, decoding only the blocks that overlap
+        first = 0 if t0 is None else self.find(t0)
+        last = self.n_blocks - 1 if t1 is None else self.find(t1)
+        blocks = [self.block(i) for i in range(first, last + 1)]
+        if not blocks:
+            return np.empty(0), np.empty((0, 4))
+        t = np.concatenate([b[0] for b in blocks])
+        q = np.concatenate([b[1] for b in blocks])
+        # Compare in stored milliseconds: t1 = 214.198 must include a sample decoded as 214.198
+        t_ms = np.rint(t * 1000)
+        keep = np.ones(len(t), dtype=bool)
+        if t0 is not None:
+            keep &= t_ms >= round(t0 * 1000)
+        if t1 is not None:
+            keep &= t_ms <= round(t1 * 1000)
+        return t[keep], q[keep]
+
+
+def decode(data):
+    return Reader(data).read()
+
+
+# Converters from the text formats
+
+def from_monitor(path):
+    # HumeralMonitor text -> {"<name>": (t, q)}
+    return {os.path.splitext(os.path.basename(path))[0]: read_monitor(path)}
+
+
+def from_motion(path, rate_hz=MOTION_RATE_HZ):
+    # motion_data.csv -> one stream per segment, timestamps synthesized at rate_hz
+    df = pd.read_csv(path)
+    t = np.arange(len(df)) / rate_hz
+    base = os.path.splitext(os.path.basename(path))[0]
+    return {f"{base}.{columns[0].split('_')[0]}": (t, df[columns].to_numpy(dtype=float))
+            for columns in (HUMERUS_COLUMNS, RADIUS_COLUMNS)}
+
+
+def convert(path):
+    return from_motion(path) if path.endswith(".csv") else from_monitor(path)
+
+
+def encode_files(paths, out_dir, compress=False, block_size=BLOCK_SIZE):
+    # Text recordings -> .rqc files; returns [(source, target, text bytes, encoded bytes, samples)]
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for path in paths:
+        streams = convert(path)
+        text_bytes = os.path.getsize(path) / len(streams)  # shared evenly by a file's streams
+        for name, (t, q) in streams.items():
+            target = os.path.join(out_dir, f"{name}.rqc")
+            data = encode(t, q, block_size, compress)
+            with open(target, "wb") as file:
+                file.write(data)
+            written.append((path, target, text_bytes, len(data), len(t)))
+    return written
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Encode quaternion recordings to the compact .rqc format.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    enc = sub.add_parser("encode", help="convert HumeralMonitor .txt / motion .csv files")
+    enc.add_argument("files", nargs="+")
+    enc.add_argument("--out-dir", default=".cache/rqc")
+    enc.add_argument("--compress", action="store_true", help="zlib-compress each block")
+    enc.add_argument("--block-size", type=int, default=BLOCK_SIZE)
+    info = sub.add_parser("info", help="print block index and precision of .rqc files")
+    info.add_argument("files", nargs="+")
+    args = parser.parse_args()
+
+    if args.command == "encode":
+        for source, target, text_bytes, size, n in encode_files(args.files, args.out_dir, args.compress,
+                                                                args.block_size):
+            started = time.perf_counter()
+            decode(target)
+            seconds = time.perf_counter() - started
+            print(f"{source} -> {target}: {n} samples, {text_bytes / n:.1f} -> {size / n:.2f} bytes/sample "
+                  f"({text_bytes / size:.1f}x), decode {n / seconds / 1e6:.1f} M samples/s")
+    else:
+        for path in args.files:
+            reader = Reader(path)
+            t, _ = reader.read()
+            span = f"t {t[0]:.3f}-{t[-1]:.3f} s" if len(t) else "empty"
+            print(f"{path}: {len(reader)} samples in {reader.n_blocks} blocks, "
+                  f"{'zlib' if reader.compressed else 'raw'}, {reader.bits} bits/component, {span}")
@@ -0,0 +1,57 @@
+import sqlite3
+import threading
+
+# Small SQLite base shared by the stores: WAL mode so Streamlit workers can read while one
+# writes, one connection per thread, and explicit short write transactions.
+# Streamlit runs every rerun on a fresh ScriptRunner thread, so connections of threads that
+# have exited are closed whenever a new one is opened instead of piling up.
+
+
+class Database:
+    SCHEMA = ""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._open = {}  # thread -> its connection
+        self._open_lock = threading.Lock()
+        if self.SCHEMA:
+            self._connection().executescript(self.SCHEMA)
+
+    def _connection(self):
+        # One connection per thread. check_same_thread is off only so that a dead thread's
+        # connection can be closed from here; a connection is never used by two threads.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            with self._open_lock:
+                for thread in [thread for thread in self._open if not thread.is_alive()]:
+                    self._open.pop(thread).close()
+                self._open[threading.current_thread()] = conn
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self):
+        return _Transaction(self._connection())
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE ... COMMIT/ROLLBACK around one write; nested use joins the outer transaction
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.outer = not conn.in_transaction
+
+    def __enter__(self):
+        if self.outer:
+            self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.outer:
+            self.conn.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
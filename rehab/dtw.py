@@ -0,0 +1,120 @@
+import numpy as np
+
+# Motion comparison: dynamic time warping of a patient's trajectory (Rotation_Angle or arm
+# directions) against reference exercise templates. Everything is resampled to a fixed length
+# first; the DP is restricted to a Sakoe-Chiba band, evaluated one anti-diagonal at a time
+# (vectorized over the cells of the diagonal and over templates) and abandoned as soon as it cannot beat the best
+# match so far. Across a template library, LB_Keogh lower bounds skip most full DTW runs.
+RESAMPLE_LENGTH = 256
+WINDOW_FRACTION = 0.1
+
+
+def resample(series, n=RESAMPLE_LENGTH):
+    # (N,) or (N, d) -> (n, d) by linear interpolation over the sample index
+    series = np.asarray(series, dtype=float)
+    if series.ndim == 1:
+        series = series[:, None]
+    src = np.linspace(0.0, 1.0, len(series))
+    dst = np.linspace(0.0, 1.0, n)
+    return np.column_stack([np.interp(dst, src, series[:, k]) for k in range(series.shape[1])])
+
+
+def band_width(n, fraction=WINDOW_FRACTION):
+    return max(int(round(n * fraction)), 1)
+
+
+def envelope(series, window):
+    # Upper/lower envelope for LB_Keogh: running max/min over [i - window, i + window]
+    series = np.asarray(series, dtype=float)
+    padded = np.pad(series, ((window, window), (0, 0)), mode="edge")
+    views = np.lib.stride_tricks.sliding_window_view(padded, 2 * window + 1, axis=0)
+    return views.max(axis=-1), views.min(axis=-1)
+
+
+def lb_keogh(query, upper, lower):
+    # Lower bound of the banded squared-cost DTW; upper/lower may carry a leading template axis
+    above = np.clip(query - upper, 0.0, None)
+    below = np.clip(lower - query, 0.0, None)
+    return np.sum(above ** 2 + below ** 2, axis=(-2, -1))
+
+
+def dtw_many(query, templates, window, best_so_far=np.inf):
+    # Banded DTW with squared Euclidean cost between a (n, d) query and (T, n, d) templates of
+    # the same length, all templates advanced together one anti-diagonal k = i + j at a time.
+    # Returns (T,) cumulative costs; a template is abandoned (inf) once it must exceed best_so_far.
+    templates = np.asarray(templates, dtype=float)
+    n = len(query)
+    if templates.shape[1] != n:
+        raise ValueError("dtw expects series of equal length; resample them first")
+    inf = np.inf
+    result = np.full(len(templates), inf)
+    live = np.arange(len(templates))
+    # One row per template and diagonal, indexed by i + 1 so that column 0 is a permanent inf border
+    prev2 = np.full((len(live), n + 1), inf)  # diagonal k - 2
+    prev = np.full((len(live), n + 1), inf)   # diagonal k - 1
+    cur = np.full((len(live), n + 1), inf)
+    for k in range(2 * n - 1):
+        lo = max(0, k - n + 1, -((window - k) // 2))  # ceil((k - window) / 2)
+        hi = min(n - 1, k, (k + window) // 2)
+        cur.fill(inf)
+        if lo <= hi:
+            i = np.arange(lo, hi + 1)
+            cost = np.sum((query[i] - templates[live][:, k - i]) ** 2, axis=-1)
+            if k == 0:
+                cur[:, 1] = cost[:, 0]
+            else:
+                # (i - 1, j) and (i, j - 1) lie on diagonal k - 1, (i - 1, j - 1) on k - 2
+                cur[:, i + 1] = cost + np.minimum(np.minimum(prev[:, i], prev[:, i + 1]), prev2[:, i])
+        # Every warping path visits one of any two consecutive anti-diagonals
+        if k > 0 and np.isfinite(best_so_far):
+            keep = np.minimum(cur.min(axis=1), prev.min(axis=1)) <= best_so_far
+            if not keep.all():
+                live, prev2, prev, cur = live[keep], prev2[keep], prev[keep], cur[keep]
+                if len(live) == 0:
+                    return result
+        prev2, prev, cur = prev, cur, prev2
+    result[live] = prev[:, n]
+    return result
+
+
+def dtw(a, b, window, best_so_far=np.inf):
+    # Single pair; returns the cumulative cost or inf if abandoned
+    return float(dtw_many(np.asarray(a, dtype=float), [b], window, best_so_far)[0])
+
+
+def rms(cost, n):
+    # Cumulative squared cost -> root-mean-square distance per sample
+    return float(np.sqrt(cost / n))
+
+
+class TemplateLibrary:
+    def __init__(self, templates, length=RESAMPLE_LENGTH, window_fraction=WINDOW_FRACTION):
+        # templates: {name: (N,) or (N, d) array}; all must have the same dimension
+        self.names = list(templates)
+        self.length = length
+        self.window = band_width(length, window_fraction)
+        self.series = np.stack([resample(templates[name], length) for name in self.names])
+        bounds = [envelope(s, self.window) for s in self.series]
+        self.upper = np.stack([u for u, _ in bounds])
+        self.lower = np.stack([l for _, l in bounds])
+
+    def match(self, query, k=None):
+        # Score one trajectory against the library. Returns (results, stats): results are the
+        # k best (default: all) as (name, rms distance), best first, with exact distances.
+        query = resample(query, self.length)
+        bounds = lb_keogh(query, self.upper, self.lower)
+        k = len(self.names) if k is None else k
+        order = np.argsort(bounds)
+        # Exact costs for the k most promising templates set the pruning threshold ...
+        first = order[:k]
+        costs = dict(zip(first.tolist(), dtw_many(query, self.series[first], self.window)))
+        threshold = sorted(costs.values())[k - 1] if k else -np.inf
+        # ... then only templates whose lower bound can beat it run, with early abandoning
+        rest = order[k:][bounds[order[k:]] < threshold]
+        if len(rest):
+            costs.update(zip(rest.tolist(), dtw_many(query, self.series[rest], self.window, threshold)))
+        best = sorted((cost, self.names[t]) for t, cost in costs.items() if np.isfinite(cost))[:k]
+        results = [(name, rms(cost, self.length)) for cost, name in best]
+        abandoned = sum(1 for cost in costs.values() if not np.isfinite(cost))
+        return results, {"templates": len(self.names), "dtw_runs": len(costs),
+                         "pruned": len(self.names) - len(costs), "abandoned": abandoned}
@@ -0,0 +1,146 @@
+import numpy as np
+import plotly.graph_objects as go
+
+
+def _coords(points, decimals):
+    # (N, 3) -> three lists, rounded so the serialized figure stays small
+    points = np.round(np.asarray(points, dtype=float), decimals)
+    return points[:, 0].tolist(), points[:, 1].tolist(), points[:, 2].tolist()
+
+
+def _imu_traces(coords, i):
+    # Coordinates of one frame: a marker per sensor plus the line joining them
+    xs = [c[0][i] for c in coords]
+    ys = [c[1][i] for c in coords]
+    zs = [c[2][i] for c in coords]
+    points = [dict(type="scatter3d", x=[x], y=[y], z=[z]) for x, y, z in zip(xs, ys, zs)]
+    return points + [dict(type="scatter3d", x=xs, y=ys, z=zs)]
+
+
+def _imu_base(coords, names, colors, axis_range, title):
+    data = [
+        go.Scatter3d(mode="markers", marker=dict(size=8, color=color), name=name)
+        for name, color in zip(names, colors)
+    ]
+    data.append(go.Scatter3d(mode="lines", line=dict(color="black", width=3), name="连接线"))
+    for trace, first in zip(data, _imu_traces(coords, 0)):
+        trace.update(x=first["x"], y=first["y"], z=first["z"])
+
+    axis = dict(range=list(axis_range), autorange=False)
+    layout = go.Layout(
+        title=title,
+        scene=dict(
+            xaxis_title="X 轴",
+            yaxis_title="Y 轴",
+            zaxis_title="Z 轴",
+            xaxis=axis,
+            yaxis=axis,
+            zaxis=axis,
+            aspectmode="cube",
+        ),
+    )
+    return go.Figure(data=data, layout=layout)
+
+
+def imu_snapshot(points, names, colors, axis_range=(-1, 1), title=None, decimals=3):
+    # points: one (3,) position per sensor
+    coords = [_coords(np.reshape(p, (1, 3)), decimals) for p in points]
+    return _imu_base(coords, names, colors, axis_range, title)
+
+
+def imu_animation(streams, names, colors, axis_range=(-1, 1), frame_ms=100, title=None, decimals=3):
+    # Build one figure holding the whole sequence as Plotly frames so playback runs in the browser.
+    # streams: list of (N, 3) arrays, one per sensor, all the same length.
+    # Each frame only carries coordinates; marker and line styling is defined once on the base traces.
+    n_frames = len(streams[0])
+    coords = [_coords(s, decimals) for s in streams]
+    fig = _imu_base(coords, names, colors, axis_range, title)
+
+    trace_ids = list(range(len(fig.data)))
+    fig.frames = [go.Frame(data=_imu_traces(coords, i), traces=trace_ids, name=str(i)) for i in range(n_frames)]
+    fig.update_layout(
+        updatemenus=[dict(
+            type="buttons",
+            showactive=False,
+            buttons=[
+                dict(label="▶ Play", method="animate", args=[None, {
+                    "frame": {"duration": frame_ms, "redraw": True},
+                    "transition": {"duration": 0},
+                    "fromcurrent": True}]),
+                dict(label="⏸ Pause", method="animate", args=[[None], {
+                    "frame": {"duration": 0, "redraw": False},
+                    "mode": "immediate"}]),
+            ],
+        )],
+    )
+    return fig
+
+
+def series_figure(series, x0, x1, budget, title=None, xaxis_title=None, yaxis_title=None, decimals=4):
+    # series: list of (name, rehab.lod.Pyramid); only the decimated [x0, x1] slice is sent
+    fig = go.Figure()
+    for name, pyramid in series:
+        x, y = pyramid.query(x0, x1, budget)
+        fig.add_trace(go.Scattergl(x=np.round(x, decimals), y=np.round(y, decimals), mode="lines", name=name))
+    fig.update_layout(title=title, xaxis_title=xaxis_title, yaxis_title=yaxis_title,
+                      xaxis=dict(range=[x0, x1]), margin=dict(t=40, b=40))
+    return fig
+
+
+ARM_SEGMENTS = [("Radius (Upper Arm)", "red"), ("Humerus (Forearm)", "blue")]
+
+
+def _arm_traces(c1, c2, i):
+    # Coordinates of one frame: O -> P1 and P1 -> P2; the origin marker never moves
+    x1, y1, z1 = c1[0][i], c1[1][i], c1[2][i]
+    return [
+        dict(type="scatter3d", x=[0, x1], y=[0, y1], z=[0, z1]),
+        dict(type="scatter3d", x=[x1, c2[0][i]], y=[y1, c2[1][i]], z=[z1, c2[2][i]]),
+    ]
+
+
+def arm_frames(p1, p2, decimals=3, offset=0):
+    # Compare-page animation frames from per-frame segment endpoints (see rehab.kinematics).
+    # Frames only update the two segment traces (indices 1 and 2); styling lives on the base figure.
+    # offset numbers the frames of a slice, so frames can be built in chunks and concatenated.
+    c1, c2 = _coords(p1, decimals), _coords(p2, decimals)
+    return [go.Frame(data=_arm_traces(c1, c2, i), traces=[1, 2], name=str(offset + i)) for i in range(len(p1))]
+
+
+def arm_figure(p1, p2, title, axis_range=(-1.5, 1.5), frame_ms=100, decimals=3, frames=None):
+    # One figure for both directions: "Reverse" animates the same frames by name in reverse order.
+    # Building the frames is most of the cost; pass them in to build them elsewhere (e.g. in chunks)
+    if frames is None:
+        frames = arm_frames(p1, p2, decimals)
+    data = [go.Scatter3d(x=[0], y=[0], z=[0], mode="markers", marker=dict(size=4, color="black"), name="Origin")]
+    for (name, color), first in zip(ARM_SEGMENTS, frames[0].data if frames else []):
+        data.append(go.Scatter3d(x=first.x, y=first.y, z=first.z, mode="lines+markers",
+                                 marker=dict(size=4, color=color), line=dict(color=color, width=5), name=name))
+
+    axis_range = list(axis_range)
+    names = [frame.name for frame in frames]
+    play = {"frame": {"duration": frame_ms, "redraw": True}, "transition": {"duration": 0}, "fromcurrent": True}
+    return go.Figure(
+        data=data,
+        layout=go.Layout(
+            title=title,
+            scene=dict(
+                xaxis=dict(title="X", range=axis_range, autorange=False),
+                yaxis=dict(title="Y (Up)", range=axis_range, autorange=False),
+                zaxis=dict(title="Z", range=axis_range, autorange=False),
+                aspectmode="cube"
+            ),
+            updatemenus=[dict(
+                type="buttons",
+                showactive=False,
+                buttons=[
+                    dict(label="▶ Play", method="animate", args=[names, play]),
+                    dict(label="◀ Reverse", method="animate", args=[names[::-1], play]),
+                    dict(label="⏸ Pause", method="animate", args=[[None], {
+                        "frame": {"duration": 0, "redraw": False},
+                        "mode": "immediate"}])
+                ]
+            )]
+        ),
+        frames=frames
+    )
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+from rehab import quaternion
+
+DAY_SECONDS = 24 * 3600
+
+
+def parse_clock(values):
+    # "HH:MM:SS.mmm" -> seconds since midnight. The millisecond field is not zero-padded
+    # ("18:35:20.20" is 20 ms, earlier than "18:35:20.169"), so it is read as an integer count.
+    parts = pd.Series(values, dtype=str).str.split(r"[:.]", expand=True, regex=True)
+    parts = parts.reindex(columns=range(4), fill_value="0").fillna("0").astype(np.int64).to_numpy()
+    seconds = parts[:, 0] * 3600 + parts[:, 1] * 60 + parts[:, 2] + parts[:, 3] / 1000.0
+    # Recordings that run past midnight wrap back to 00:00
+    wraps = np.concatenate([[0], np.cumsum(np.diff(seconds) < -DAY_SECONDS / 2)])
+    return seconds + wraps * DAY_SECONDS
+
+
+def read_monitor(path):
+    # HumeralMonitor text file ("time x y z w" per line) -> (t, q) with q as (N, 4) w-first
+    df = pd.read_csv(path, sep=" ", header=None, names=["time", "x", "y", "z", "w"], dtype={"time": str})
+    t = parse_clock(df["time"].to_numpy())
+    q = df[["w", "x", "y", "z"]].to_numpy(dtype=float)
+    return t, q
+
+
+def _clean(t, q):
+    # Stable sort by time and drop repeated timestamps (last sample wins)
+    order = np.argsort(t, kind="stable")
+    t, q = t[order], q[order]
+    keep = np.append(t[1:] != t[:-1], True)
+    return t[keep], quaternion.normalize(q[keep])
+
+
+def _slerp(t, q, grid):
+    i = np.clip(np.searchsorted(t, grid, side="right") - 1, 0, len(t) - 2)
+    frac = np.clip((grid - t[i]) / (t[i + 1] - t[i]), 0.0, 1.0)
+    # Result stays in q[i]'s hemisphere, so component plots stay continuous
+    return quaternion.slerp(q[i], q[i + 1], frac)
+
+
+def _nearest(t, q, grid):
+    i = np.clip(np.searchsorted(t, grid), 1, len(t) - 1)
+    i -= (grid - t[i - 1]) < (t[i] - grid)
+    return q[i]
+
+
+def align_streams(streams, rate_hz=10.0, method="slerp", relative=False):
+    # Put N (t, q) streams on one clock sampled at rate_hz over the span they all cover.
+    # relative=True measures each stream from its own first sample, for sensors that were
+    # recorded in separate sessions. Returns (grid, [q_aligned, ...]) with contiguous (M, 4) arrays.
+    if method not in ("slerp", "nearest"):
+        raise ValueError(f"Unknown alignment method: {method}")
+    cleaned = []
+    for t, q in streams:
+        t, q = _clean(np.asarray(t, dtype=float), np.asarray(q, dtype=float))
+        if len(t) < 2:
+            raise ValueError("Each stream needs at least two distinct timestamps.")
+        cleaned.append((t - t[0] if relative else t, q))
+
+    start = max(t[0] for t, _ in cleaned)
+    end = min(t[-1] for t, _ in cleaned)
+    if end < start:
+        raise ValueError("Streams do not overlap in time.")
+
+    grid = start + np.arange(int(np.floor((end - start) * rate_hz)) + 1) / rate_hz
+    resample = _slerp if method == "slerp" else _nearest
+    return grid, [np.ascontiguousarray(resample(t, q, grid)) for t, q in cleaned]
@@ -0,0 +1,190 @@
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+import streamlit as st
+
+# Shared background job runner so slow work does not run inline in a page script.
+# Jobs are keyed by a hash of the function and its inputs: every session asking for the
+# same computation attaches to one job. Pages keep their jobs in st.session_state and poll
+# progress; when a session navigates to another page its jobs are released, and a job no
+# session is waiting on any more is cancelled.
+THREAD_WORKERS = 4
+KEEP_FINISHED = 32
+
+
+class Cancelled(Exception):
+    pass
+
+
+def _update_digest(digest, value):
+    if isinstance(value, np.ndarray):
+        digest.update(f"nd|{value.dtype}|{value.shape}|".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"seq|{len(value)}|".encode())
+        for item in value:
+            _update_digest(digest, item)
+    elif isinstance(value, dict):
+        digest.update(f"map|{len(value)}|".encode())
+        for key in sorted(value, key=repr):
+            _update_digest(digest, key)
+            _update_digest(digest, value[key])
+    else:
+        digest.update(f"{type(value).__name__}|{value!r}|".encode())
+
+
+def input_hash(fn, inputs):
+    digest = hashlib.sha1(f"{fn.__module__}.{fn.__qualname__}|".encode())
+    _update_digest(digest, inputs)
+    return digest.hexdigest()
+
+
+class Job:
+    # Thread jobs receive the Job as their first argument: report() progress and partial
+    # results, and call check() between steps so cancellation takes effect
+    def __init__(self, key, kind):
+        self.key = key
+        self.kind = kind
+        self.progress = 0.0
+        self.partial = None
+        self.message = ""
+        self.future = None
+        self.sessions = set()
+        self._cancel = threading.Event()
+
+    def report(self, progress, partial=None, message=None):
+        self.progress = float(progress)
+        if partial is not None:
+            self.partial = partial
+        if message is not None:
+            self.message = message
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check(self):
+        if self._cancel.is_set():
+            raise Cancelled(self.key)
+
+    def cancel(self):
+        self._cancel.set()
+        if self.future is not None:
+            self.future.cancel()
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+    def result(self, timeout=None):
+        return self.future.result(timeout)
+
+    @property
+    def status(self):
+        if self.cancelled:
+            return "cancelled"
+        if not self.done():
+            return "running" if self.future.running() else "queued"
+        return "failed" if self.future.exception() is not None else "done"
+
+
+def _run_thread(job, fn, args):
+    job.check()
+    result = fn(job, *args)
+    job.report(1.0)
+    return result
+
+
+class JobRunner:
+    def __init__(self, threads=THREAD_WORKERS, processes=None, keep=KEEP_FINISHED):
+        self._threads = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="rehab-job")
+        self._processes = None
+        self._process_workers = processes
+        self._keep = keep
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _process_pool(self):
+        if self._processes is None:
+            self._processes = ProcessPoolExecutor(max_workers=self._process_workers)
+        return self._processes
+
+    def submit(self, fn, *args, inputs=None, kind="thread", session=None):
+        # kind="process" runs fn(*args) in a worker process (fn and args must pickle, no progress);
+        # kind="thread" runs fn(job, *args). inputs overrides what the dedup hash is taken over.
+        key = input_hash(fn, args if inputs is None else inputs)
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.cancelled or job.status == "failed":
+                job = Job(key, kind)
+                if kind == "process":
+                    job.future = self._process_pool().submit(fn, *args)
+                    job.future.add_done_callback(lambda _: job.report(1.0))
+                else:
+                    job.future = self._threads.submit(_run_thread, job, fn, args)
+                self._jobs[key] = job
+            self._jobs.move_to_end(key)
+            if session is not None:
+                job.sessions.add(session)
+            self._trim()
+        return job
+
+    def _trim(self):
+        # Oldest finished jobs go first; sessions still holding one keep their own reference
+        finished = [key for key, job in self._jobs.items() if job.done()]
+        for key in finished[:max(len(self._jobs) - self._keep, 0)]:
+            del self._jobs[key]
+
+    def release(self, job, session):
+        with self._lock:
+            job.sessions.discard(session)
+            if not job.sessions and not job.done():
+                job.cancel()
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {status: sum(job.status == status for job in jobs)
+                for status in ("queued", "running", "done", "failed", "cancelled")}
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_runner():
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner()
+        return _runner
+
+
+def _session_id():
+    if "job_session" not in st.session_state:
+        st.session_state.job_session = uuid.uuid4().hex
+    return st.session_state.job_session
+
+
+def run(name, fn, *args, inputs=None, kind="thread"):
+    # Start (or join) a job and remember it in this session under name
+    jobs = st.session_state.setdefault("jobs", {})
+    job = get_runner().submit(fn, *args, inputs=inputs, kind=kind, session=_session_id())
+    previous = jobs.get(name)
+    if previous is not None and previous is not job:
+        get_runner().release(previous, _session_id())
+    jobs[name] = job
+    return job
+
+
+def enter_page(page):
+    # Call once per rerun with the page being shown; leaving a page releases its jobs
+    if st.session_state.get("jobs_page") == page:
+        return
+    for job in st.session_state.get("jobs", {}).values():
+        get_runner().release(job, _session_id())
+    st.session_state.jobs = {}
+    st.session_state.jobs_page = page
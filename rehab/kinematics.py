@@ -0,0 +1,45 @@
+import numpy as np
+from rehab import quaternion
+from rehab.cache import load_table
+
+HUMERUS_COLUMNS = ["Humerus_w", "Humerus_x", "Humerus_y", "Humerus_z"]
+RADIUS_COLUMNS = ["Radius_w", "Radius_x", "Radius_y", "Radius_z"]
+
+
+def load_motion(path):
+    # motion_data.csv -> {column: memory-mapped array}
+    return load_table(path)
+
+
+def segment_directions(quats):
+    # (N, 4) w-first quaternions -> (N, 3) unit x-axis rotated by each, Y/Z swapped so Y is up
+    dirs = quaternion.rotate(quaternion.normalize(quats), [1.0, 0.0, 0.0])
+    return dirs[:, [0, 2, 1]]
+
+
+def rotation_angle(quats):
+    # (N, 4) w-first quaternions -> (N,) rotation from the first sample, degrees; the live
+    # sensors send no Rotation_Angle, so this stands in for it when counting repetitions
+    q = quaternion.normalize(quats)
+    return np.degrees(quaternion.angle_between(q[:1], q))
+
+
+def arm_segments(humerus_q, radius_q):
+    # Per-frame segment endpoints: O -> P1 is the radius, P1 -> P2 the humerus
+    p1 = segment_directions(radius_q)
+    p2 = p1 + segment_directions(humerus_q)
+    return p1, p2
+
+
+def quaternion_columns(columns, names):
+    # Works for a DataFrame or a {column: array} mapping
+    return np.column_stack([columns[name] for name in names])
+
+
+def motion_segments(columns):
+    return arm_segments(quaternion_columns(columns, HUMERUS_COLUMNS), quaternion_columns(columns, RADIUS_COLUMNS))
+
+
+def motion_quaternions(columns):
+    # motion_data.csv columns -> {segment: (N, 4) w-first quaternions}
+    return {"Humerus": quaternion_columns(columns, HUMERUS_COLUMNS), "Radius": quaternion_columns(columns, RADIUS_COLUMNS)}
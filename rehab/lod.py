@@ -0,0 +1,78 @@
+import numpy as np
+
+# Level-of-detail for long time-series plots. A Pyramid keeps min/max buckets at
+# successively coarser levels so a plot of any time range touches at most a point budget,
+# and bucket extremes keep peaks exact at every zoom level.
+POINTS_PER_PIXEL = 2
+LEVEL_FACTOR = 4
+
+
+def budget_for_width(width_px, points_per_px=POINTS_PER_PIXEL):
+    return max(int(width_px * points_per_px), 16)
+
+
+def minmax_decimate(x, y, n_out):
+    # Keep the min and max of each bucket (in time order): at most n_out points
+    x, y = np.asarray(x), np.asarray(y, dtype=float)
+    n_buckets = n_out // 2
+    if len(y) <= n_out or n_buckets < 1:
+        return x, y
+    size = -(-len(y) // n_buckets)
+    pad = size * n_buckets - len(y)
+    blocks = np.pad(y, (0, pad), constant_values=np.nan).reshape(n_buckets, size)
+    blocks = blocks[~np.all(np.isnan(blocks), axis=1)]
+    offsets = np.arange(len(blocks))[:, None] * size
+    lo = np.nanargmin(blocks, axis=1)[:, None]
+    hi = np.nanargmax(blocks, axis=1)[:, None]
+    idx = np.sort(np.hstack([lo, hi]), axis=1) + offsets
+    idx = idx.ravel()
+    idx = idx[np.diff(idx, prepend=-1) != 0]
+    return x[idx], y[idx]
+
+
+def lttb(x, y, n_out):
+    # Largest-Triangle-Three-Buckets; first and last points are always kept
+    x, y = np.asarray(x), np.asarray(y, dtype=float)
+    n = len(y)
+    if n <= n_out or n_out < 3:
+        return x, y
+    xf = x.astype(float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        cx, cy = xf[end:next_end].mean(), y[end:next_end].mean()
+        area = np.abs((xf[a] - cx) * (y[start:end] - y[a]) - (xf[a] - xf[start:end]) * (cy - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return x[keep], y[keep]
+
+
+class Pyramid:
+    # Multi-resolution view of one series; level 0 is the raw data
+
+    def __init__(self, x, y, min_points=2048, factor=LEVEL_FACTOR):
+        x, y = np.asarray(x), np.asarray(y, dtype=float)
+        self.levels = [(x, y)]
+        while len(self.levels[-1][1]) > min_points:
+            lx, ly = self.levels[-1]
+            n_out = 2 * max(len(ly) // (2 * factor), 1)
+            self.levels.append(minmax_decimate(lx, ly, n_out))
+
+    @property
+    def x_range(self):
+        x = self.levels[0][0]
+        return x[0], x[-1]
+
+    def query(self, x0, x1, budget):
+        # Points in [x0, x1] from the finest level that fits the budget, finished with LTTB
+        for lx, ly in self.levels:
+            lo, hi = np.searchsorted(lx, x0, side="left"), np.searchsorted(lx, x1, side="right")
+            if hi - lo <= budget * LEVEL_FACTOR:
+                break
+        # Keep the neighbours just outside the window so lines reach the plot edges
+        lo, hi = max(lo - 1, 0), min(hi + 1, len(ly))
+        return lttb(lx[lo:hi], ly[lo:hi], budget)
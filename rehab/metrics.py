@@ -0,0 +1,178 @@
+import cProfile
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Per-rerun hot-path instrumentation. Stages record wall and CPU time, charts record the
+# payload bytes sent to the browser, and every rerun is counted per page and role.
+# Totals are served as Prometheus text when REHAB_METRICS_PORT is set, and one JSON line
+# per rerun goes to a rolling log. With REHAB_PROFILE=1 set on the server, ?profile=1 on a
+# page URL cProfiles that one rerun; only the newest PROFILE_KEEP .prof files are kept.
+METRICS_LOG = os.environ.get("REHAB_METRICS_LOG", ".cache/metrics.log")
+METRICS_PORT = os.environ.get("REHAB_METRICS_PORT")
+PROFILE_DIR = os.environ.get("REHAB_PROFILE_DIR", ".cache/profiles")
+PROFILE_ENABLED = os.environ.get("REHAB_PROFILE") == "1"
+PROFILE_KEEP = int(os.environ.get("REHAB_PROFILE_KEEP", "20"))
+PAYLOAD_SAMPLE_EVERY = int(os.environ.get("REHAB_PAYLOAD_SAMPLE_EVERY", "10"))  # payload sizing costs a serialization
+
+_lock = threading.Lock()
+_current = threading.local()
+_totals = defaultdict(float)  # (metric, labels) -> value
+_payload_calls = defaultdict(int)
+_log = None
+_server = None
+
+
+def _add(metric, labels, value):
+    with _lock:
+        _totals[(metric, tuple(sorted(labels.items())))] += value
+
+
+def _logger():
+    global _log
+    if _log is not None:
+        return _log
+    with _lock:
+        # Two first reruns racing here would otherwise both attach a handler
+        if _log is not None:
+            return _log
+        os.makedirs(os.path.dirname(METRICS_LOG) or ".", exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(METRICS_LOG, maxBytes=5 * 1024 * 1024, backupCount=3)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log = logging.getLogger("rehab.metrics")
+        log.propagate = False
+        log.setLevel(logging.INFO)
+        log.addHandler(handler)
+        _log = log
+    return _log
+
+
+@contextmanager
+def stage(name):
+    wall, cpu = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        wall, cpu = time.perf_counter() - wall, time.thread_time() - cpu
+        _add("rehab_stage_wall_seconds_total", {"stage": name}, wall)
+        _add("rehab_stage_cpu_seconds_total", {"stage": name}, cpu)
+        _add("rehab_stage_calls_total", {"stage": name}, 1)
+        record = getattr(_current, "record", None)
+        if record is not None:
+            record["stages"].append({"stage": name, "wall": round(wall, 6), "cpu": round(cpu, 6)})
+
+
+def record_payload(name, nbytes):
+    _add("rehab_payload_bytes_total", {"stage": name}, nbytes)
+    _add("rehab_payload_samples_total", {"stage": name}, 1)
+    record = getattr(_current, "record", None)
+    if record is not None:
+        record["payload"][name] = nbytes
+
+
+def plotly_chart(fig, name, container=None, **kwargs):
+    # container.plotly_chart (default st) wrapped in a stage; every PAYLOAD_SAMPLE_EVERY-th
+    # call also sizes the figure JSON
+    import plotly.io as pio
+    import streamlit as st
+
+    with _lock:
+        _payload_calls[name] += 1
+        sample = _payload_calls[name] % PAYLOAD_SAMPLE_EVERY == 1 or PAYLOAD_SAMPLE_EVERY == 1
+    if sample:
+        payload = json.dumps(fig) if isinstance(fig, dict) else pio.to_json(fig, validate=False)
+        record_payload(name, len(payload.encode()))
+    with stage(f"plotly_chart:{name}"):
+        return (container or st).plotly_chart(fig, **kwargs)
+
+
+def _prune_profiles():
+    # Keep the newest PROFILE_KEEP dumps; names start with the timestamp, so they sort by age
+    names = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(".prof"))
+    for name in names[:max(len(names) - PROFILE_KEEP, 0)]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, name))
+        except OSError:
+            pass
+
+
+@contextmanager
+def rerun(page, role, profile=False):
+    # Wrap one script run; nested stages are attributed to it. profile is ignored unless
+    # REHAB_PROFILE=1
+    ensure_server()
+    record = {"time": time.time(), "page": page, "role": role, "stages": [], "payload": {}}
+    _current.record = record
+    _add("rehab_reruns_total", {"page": page, "role": role}, 1)
+    profiler = cProfile.Profile() if profile and PROFILE_ENABLED else None
+    wall, cpu = time.perf_counter(), time.thread_time()
+    if profiler:
+        profiler.enable()
+    try:
+        yield record
+    finally:
+        if profiler:
+            profiler.disable()
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{page}.prof".replace("/", "_"))
+            profiler.dump_stats(path)
+            record["profile"] = path
+            _prune_profiles()
+        record["wall"] = round(time.perf_counter() - wall, 6)
+        record["cpu"] = round(time.thread_time() - cpu, 6)
+        _add("rehab_rerun_wall_seconds_total", {"page": page, "role": role}, record["wall"])
+        _add("rehab_rerun_cpu_seconds_total", {"page": page, "role": role}, record["cpu"])
+        _current.record = None
+        _logger().info(json.dumps(record))
+
+
+def prometheus_text():
+    with _lock:
+        items = sorted(_totals.items())
+    lines, seen = [], set()
+    for (metric, labels), value in items:
+        if metric not in seen:
+            seen.add(metric)
+            lines.append(f"# TYPE {metric} counter")
+        label_text = ",".join(f'{k}="{v}"' for k, v in labels)
+        lines.append(f"{metric}{{{label_text}}} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def ensure_server():
+    # Start the /metrics endpoint once per process, only when REHAB_METRICS_PORT is set
+    global _server
+    if _server is not None or not METRICS_PORT:
+        return
+    with _lock:
+        if _server is not None:
+            return
+        try:
+            _server = ThreadingHTTPServer(("127.0.0.1", int(METRICS_PORT)), _Handler)
+        except OSError:
+            # Another worker process already serves this port
+            _server = False
+            return
+    threading.Thread(target=_server.serve_forever, daemon=True, name="rehab-metrics").start()
@@ -0,0 +1,83 @@
+import threading
+import time
+
+import numpy as np
+
+# Playback clock for server-pushed views: frames are scheduled from the recording's own
+# timestamps, frames that are already late are skipped instead of queued, and each viewer's
+# update rate is capped. The cap shrinks as more viewers play at once, so the server's total
+# render rate stays bounded and every viewer degrades to fewer frames rather than lagging.
+MAX_FPS = 10.0
+TOTAL_FPS = 60.0  # render budget shared by every playback in this process
+
+_active = 0
+_active_lock = threading.Lock()
+
+
+def active_viewers():
+    return _active
+
+
+class PlaybackClock:
+    def __init__(self, timestamps, speed=1.0, max_fps=MAX_FPS, total_fps=TOTAL_FPS):
+        t = np.asarray(timestamps, dtype=float)
+        self.offsets = t - t[0] if len(t) else t
+        self.speed = speed
+        self.max_fps = max_fps
+        self.total_fps = total_fps
+        self.rendered = 0
+        self.dropped = 0
+        self.lag_sum = 0.0
+        self.lag_max = 0.0
+        self.started = None
+        self.last_index = -1
+
+    def interval(self):
+        # Minimum seconds between updates for this viewer right now
+        return 1.0 / min(self.max_fps, self.total_fps / max(active_viewers(), 1))
+
+    def _elapsed(self):
+        return (time.perf_counter() - self.started) * self.speed
+
+    def frames(self):
+        # Yields the index of the newest frame that is due; frames passed over meanwhile are dropped
+        global _active
+        n = len(self.offsets)
+        with _active_lock:
+            _active += 1
+        try:
+            self.started = time.perf_counter()
+            next_update = self.started
+            while self.last_index < n - 1:
+                now = time.perf_counter()
+                if now < next_update:
+                    time.sleep(next_update - now)
+                due = int(np.searchsorted(self.offsets, self._elapsed(), side="right")) - 1
+                if due <= self.last_index:
+                    # Nothing new yet: sleep until the next recorded sample is due
+                    wait = (self.offsets[self.last_index + 1] - self._elapsed()) / self.speed
+                    time.sleep(max(wait, 0.0))
+                    continue
+                self.dropped += due - self.last_index - 1
+                self.last_index = due
+                next_update = time.perf_counter() + self.interval()
+                yield due
+                # Measured once the caller has rendered the frame, so rendering time counts as lag
+                lag = float(self._elapsed() - self.offsets[due]) / self.speed  # wall seconds behind the recording
+                self.lag_sum += lag
+                self.lag_max = max(self.lag_max, lag)
+                self.rendered += 1
+        finally:
+            with _active_lock:
+                _active -= 1
+
+    def stats(self):
+        wall = time.perf_counter() - self.started if self.started else 0.0
+        return {
+            "rendered": self.rendered,
+            "dropped": self.dropped,
+            "fps": self.rendered / wall if wall > 0 else 0.0,
+            "mean_lag": self.lag_sum / self.rendered if self.rendered else 0.0,
+            "max_lag": self.lag_max,
+            "viewers": active_viewers(),
+        }
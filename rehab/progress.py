@@ -0,0 +1,98 @@
+from datetime import date
+
+from rehab.db import Database
+from rehab.users import USER_DB_FILE
+
+# Per-patient progress rollups, updated once when a training session finishes so the
+# doctor's progress table is a single indexed query instead of a pass over raw recordings.
+# progress_summary keeps running sums for a least-squares ROM trend (degrees per day).
+PROGRESS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS progress_daily (
+    username TEXT NOT NULL,
+    day TEXT NOT NULL,
+    sessions INTEGER NOT NULL,
+    reps INTEGER NOT NULL,
+    rom_sum REAL NOT NULL,
+    rom_max REAL NOT NULL,
+    PRIMARY KEY (username, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS progress_summary (
+    username TEXT PRIMARY KEY,
+    sessions INTEGER NOT NULL,
+    reps INTEGER NOT NULL,
+    first_day TEXT NOT NULL,
+    last_day TEXT NOT NULL,
+    last_rom REAL NOT NULL,
+    sum_x REAL NOT NULL,
+    sum_y REAL NOT NULL,
+    sum_xx REAL NOT NULL,
+    sum_xy REAL NOT NULL
+);
+"""
+
+TREND_EPOCH = date(2020, 1, 1).toordinal()  # keeps the regression sums small
+
+class ProgressStore(Database):
+    SCHEMA = PROGRESS_SCHEMA
+
+    def __init__(self, path=USER_DB_FILE):
+        super().__init__(path)
+
+    def record_session(self, username, day, reps, mean_rom, max_rom):
+        # Fold one finished session into the daily and summary rollups
+        day = day.isoformat() if isinstance(day, date) else day
+        x = float(date.fromisoformat(day).toordinal() - TREND_EPOCH)
+        with self._transaction() as conn:
+            conn.execute(
+                """INSERT INTO progress_daily VALUES (?, ?, 1, ?, ?, ?)
+                   ON CONFLICT (username, day) DO UPDATE SET
+                       sessions = sessions + 1,
+                       reps = reps + excluded.reps,
+                       rom_sum = rom_sum + excluded.rom_sum,
+                       rom_max = max(rom_max, excluded.rom_max)""",
+                (username, day, reps, mean_rom, max_rom),
+            )
+            conn.execute(
+                """INSERT INTO progress_summary VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (username) DO UPDATE SET
+                       sessions = sessions + 1,
+                       reps = reps + excluded.reps,
+                       first_day = min(first_day, excluded.first_day),
+                       -- A backdated session must not replace the latest ROM
+                       last_rom = CASE WHEN excluded.last_day >= last_day THEN excluded.last_rom ELSE last_rom END,
+                       last_day = max(last_day, excluded.last_day),
+                       sum_x = sum_x + excluded.sum_x,
+                       sum_y = sum_y + excluded.sum_y,
+                       sum_xx = sum_xx + excluded.sum_xx,
+                       sum_xy = sum_xy + excluded.sum_xy""",
+                (username, reps, day, day, mean_rom, x, mean_rom, x * x, x * mean_rom),
+            )
+
+    def doctor_table(self, doctor, today=None):
+        # One row per patient of the doctor, in roster order
+        today = (today or date.today()).isoformat()
+        rows = self._connection().execute(
+            """SELECT u.username AS patient, u.injury_type, u.start_date,
+                      CAST(julianday(?) - julianday(u.start_date) AS INTEGER) AS days_since_start,
+                      coalesce(s.sessions, 0) AS sessions, coalesce(s.reps, 0) AS reps,
+                      s.last_day AS last_session, s.last_rom,
+                      CASE WHEN s.sessions > 1 AND s.sessions * s.sum_xx - s.sum_x * s.sum_x > 0
+                           THEN (s.sessions * s.sum_xy - s.sum_x * s.sum_y) / (s.sessions * s.sum_xx - s.sum_x * s.sum_x)
+                      END AS rom_trend
+               FROM doctor_patients AS dp
+               JOIN users AS u ON u.username = dp.patient
+               LEFT JOIN progress_summary AS s ON s.username = dp.patient
+               WHERE dp.doctor = ?
+               ORDER BY dp.rowid""",
+            (today, doctor),
+        )
+        return [dict(row) for row in rows]
+
+    def daily(self, username, since=None):
+        # Per-day rollups for one patient, oldest first
+        rows = self._connection().execute(
+            """SELECT day, sessions, reps, rom_sum / sessions AS mean_rom, rom_max
+               FROM progress_daily WHERE username = ? AND day >= ? ORDER BY day""",
+            (username, since.isoformat() if since else ""),
+        )
+        return [dict(row) for row in rows]
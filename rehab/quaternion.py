@@ -0,0 +1,71 @@
+import numpy as np
+
+# Quaternion helpers on (N, 4) arrays in w-first order (w, x, y, z), broadcasting like NumPy.
+# Small enough to keep scipy out of the page imports.
+
+
+def as_array(q):
+    return np.asarray(q, dtype=float)
+
+
+def from_xyzw(q):
+    # Scalar-last (x, y, z, w) -> w-first
+    q = as_array(q)
+    return q[..., [3, 0, 1, 2]]
+
+
+def normalize(q):
+    q = as_array(q)
+    return q / np.linalg.norm(q, axis=-1, keepdims=True)
+
+
+def conjugate(q):
+    q = as_array(q)
+    return q * np.array([1.0, -1.0, -1.0, -1.0])
+
+
+def multiply(a, b):
+    # Hamilton product a * b
+    a, b = as_array(a), as_array(b)
+    aw, ax, ay, az = np.moveaxis(a, -1, 0)
+    bw, bx, by, bz = np.moveaxis(b, -1, 0)
+    return np.stack([
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+    ], axis=-1)
+
+
+def rotate(q, v):
+    # Rotate vector(s) v (..., 3) by unit quaternion(s) q (..., 4)
+    q, v = as_array(q), as_array(v)
+    w, u = q[..., :1], q[..., 1:]
+    uv = np.cross(u, v)
+    return v + 2.0 * (w * uv + np.cross(u, uv))
+
+
+def dot(a, b):
+    return np.sum(as_array(a) * as_array(b), axis=-1)
+
+
+def slerp(q0, q1, t):
+    # Pairwise spherical interpolation between unit quaternions, t in [0, 1] per row.
+    # Takes the short way round by flipping q1 into q0's hemisphere.
+    q0, q1 = as_array(q0), as_array(q1)
+    t = as_array(t)[..., None]
+    d = dot(q0, q1)[..., None]
+    q1 = np.where(d < 0, -q1, q1)
+    d = np.abs(d)
+    theta = np.arccos(np.clip(d, -1.0, 1.0))
+    sin_theta = np.sin(theta)
+    close = sin_theta < 1e-6
+    safe = np.where(close, 1.0, sin_theta)
+    w0 = np.where(close, 1.0 - t, np.sin((1.0 - t) * theta) / safe)
+    w1 = np.where(close, t, np.sin(t * theta) / safe)
+    return normalize(w0 * q0 + w1 * q1)
+
+
+def angle_between(a, b):
+    # Rotation angle (radians) taking unit quaternion a to b
+    return 2.0 * np.arccos(np.clip(np.abs(dot(a, b)), 0.0, 1.0))
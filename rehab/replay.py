@@ -0,0 +1,92 @@
+import argparse
+import asyncio
+import os
+import time
+
+import numpy as np
+
+from rehab.ingest import read_monitor
+from rehab.stream import DEFAULT_HOST, DEFAULT_PORT, clock_now
+
+# Stand-in for real hardware: streams HumeralMonitor files into rehab.stream at their
+# recorded rate (or faster) so throughput, latency and backpressure can be tested locally.
+BATCH_SECONDS = 0.02
+
+
+def format_clock(seconds):
+    seconds = seconds % (24 * 3600)
+    ms = int(round((seconds % 1) * 1000)) % 1000
+    whole = int(seconds)
+    return f"{whole // 3600:02d}:{whole // 60 % 60:02d}:{whole % 60:02d}.{ms:03d}"
+
+
+async def replay_file(path, patient, sensor, host, port, speed, loops):
+    t, q = read_monitor(path)
+    offsets = t - t[0]
+    if speed > 0:
+        offsets = offsets / speed
+    span = offsets[-1] + (np.median(np.diff(offsets)) if len(offsets) > 1 else 0.0)
+
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(f"{patient} {sensor}\n".encode())
+    stats = {"sensor": sensor, "samples": 0, "drain_seconds": 0.0}
+    started = time.perf_counter()
+    i = 0
+    total = len(t) * loops
+    while i < total:
+        elapsed = time.perf_counter() - started
+        if speed > 0:
+            # Send everything that is due now, then sleep until the next sample
+            loop_index, row = divmod(i, len(t))
+            due = loop_index * span + offsets[row]
+            if due > elapsed:
+                await asyncio.sleep(min(due - elapsed, BATCH_SECONDS))
+                continue
+            end = i + 1
+            while end < total:
+                loop_index, row = divmod(end, len(t))
+                if loop_index * span + offsets[row] > elapsed:
+                    break
+                end += 1
+        else:
+            end = min(i + 1000, total)
+        # Restamp with the send time so the server can measure end-to-end lag
+        stamp = format_clock(clock_now())
+        rows = q[np.arange(i, end) % len(t)]
+        payload = "".join(f"{stamp} {x:.4f} {y:.4f} {z:.4f} {w:.4f}\n" for w, x, y, z in rows)
+        writer.write(payload.encode())
+        drain_started = time.perf_counter()
+        await writer.drain()
+        stats["drain_seconds"] += time.perf_counter() - drain_started
+        stats["samples"] += end - i
+        i = end
+    writer.close()
+    await writer.wait_closed()
+    stats["seconds"] = time.perf_counter() - started
+    return stats
+
+
+async def _main(args):
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        replay_file(path, args.patient, os.path.splitext(os.path.basename(path))[0],
+                    args.host, args.port, args.speed, args.loops)
+        for path in args.files
+    ])
+    elapsed = time.perf_counter() - started
+    for r in results:
+        print(f"{r['sensor']}: {r['samples']} samples in {r['seconds']:.2f} s "
+              f"({r['samples'] / r['seconds']:.0f}/s), blocked on backpressure {r['drain_seconds']:.2f} s")
+    total = sum(r["samples"] for r in results)
+    print(f"total: {total} samples in {elapsed:.2f} s ({total / elapsed:.0f}/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay HumeralMonitor recordings into the ingestion server.")
+    parser.add_argument("files", nargs="+", help="HumeralMonitor text files, one sensor each")
+    parser.add_argument("--patient", default="demo")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--speed", type=float, default=1.0, help="playback speed multiplier; 0 sends as fast as possible")
+    parser.add_argument("--loops", type=int, default=1)
+    asyncio.run(_main(parser.parse_args()))
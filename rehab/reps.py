@@ -0,0 +1,265 @@
+import numpy as np
+
+# Repetition counting and range of motion over a Rotation_Angle stream (degrees).
+# A turning point is confirmed once the angle retreats `threshold` degrees from the running
+# extreme; one repetition is valley -> peak -> valley. The batch and online paths apply the
+# same rule and produce the same repetitions.
+DEFAULT_RATE_HZ = 10.0
+DEFAULT_THRESHOLD = 20.0
+
+REP_FIELDS = ["start", "peak", "end", "rom", "peak_velocity", "duration"]
+
+
+class _ZigZag:
+    # Hysteresis state machine shared by both paths; fed one value at a time
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.direction = 0  # +1 rising towards a peak, -1 falling towards a valley, 0 not yet known
+        self.low = self.high = None  # running extremes while the direction is unknown
+        self.extreme = None
+
+    def update(self, index, value):
+        # Returns (kind, index, value) for a newly confirmed turning point, else None
+        if self.direction == 0:
+            if self.low is None:
+                self.low = self.high = (index, value)
+                return None
+            if value < self.low[1]:
+                self.low = (index, value)
+            if value > self.high[1]:
+                self.high = (index, value)
+            if value - self.low[1] >= self.threshold:
+                self.direction, self.extreme = 1, (index, value)
+                return ("valley",) + self.low
+            if self.high[1] - value >= self.threshold:
+                self.direction, self.extreme = -1, (index, value)
+                return ("peak",) + self.high
+            return None
+        if (value - self.extreme[1]) * self.direction > 0:
+            self.extreme = (index, value)
+            return None
+        if (self.extreme[1] - value) * self.direction >= self.threshold:
+            turned = ("peak" if self.direction > 0 else "valley",) + self.extreme
+            self.direction, self.extreme = -self.direction, (index, value)
+            return turned
+        return None
+
+    def finish(self):
+        # End of stream: confirm the pending candidate extreme, if the direction is known
+        if self.direction == 0:
+            return None
+        return ("peak" if self.direction > 0 else "valley",) + self.extreme
+
+
+def _candidates(angle):
+    # Local extrema (first sample of flat runs) plus both ends; the zig-zag only needs these
+    n = len(angle)
+    if n < 3:
+        return np.arange(n)
+    starts = np.flatnonzero(np.diff(angle, prepend=np.nan) != 0)
+    rising = np.diff(angle[starts]) > 0
+    turns = np.flatnonzero(rising[1:] != rising[:-1]) + 1
+    candidates = np.concatenate([starts[:1], starts[turns], starts[-1:], [n - 1]])
+    return candidates[np.diff(candidates, prepend=-1) != 0]
+
+
+SCAN_WINDOW = 64
+
+
+def _settle(x, threshold):
+    # Direction-unknown phase of _ZigZag over candidate values x: the first sample that is
+    # `threshold` above the running low (or below the running high) confirms that extreme.
+    # Returns (kind, extreme position, confirming position) or None if the swing never gets there.
+    low, low_pos, high, high_pos = x[0], 0, x[0], 0
+    lo, width = 1, SCAN_WINDOW
+    while lo < len(x):
+        w = x[lo:lo + width]
+        run_low = np.minimum(np.minimum.accumulate(w), low)
+        run_high = np.maximum(np.maximum.accumulate(w), high)
+        up = w - run_low >= threshold
+        down = run_high - w >= threshold
+        hit = np.flatnonzero(up | down)
+        if len(hit):
+            j = hit[0]
+            head = w[:j + 1]
+            if up[j]:  # checked first, as in _ZigZag.update
+                pos = lo + int(np.argmin(head)) if head.min() < low else low_pos
+                return "valley", pos, lo + j
+            pos = lo + int(np.argmax(head)) if head.max() > high else high_pos
+            return "peak", pos, lo + j
+        if w.min() < low:
+            low, low_pos = w.min(), lo + int(np.argmin(w))
+        if w.max() > high:
+            high, high_pos = w.max(), lo + int(np.argmax(w))
+        lo, width = lo + width, width * 2
+    return None
+
+
+def _next_turn(x, start, direction, threshold):
+    # From the candidate extreme at `start`, follow the running extreme (max for direction +1,
+    # min for -1) until a sample retreats `threshold` from it. Windows double, so each turn
+    # costs O(distance) NumPy work. Returns (extreme position, confirming position or None).
+    best, best_pos = x[start] * direction, start
+    lo, width = start + 1, SCAN_WINDOW
+    while lo < len(x):
+        w = x[lo:lo + width] * direction
+        run = np.maximum(np.maximum.accumulate(w), best)
+        hit = np.flatnonzero(run - w >= threshold)
+        if len(hit):
+            j = hit[0]
+            head = w[:j + 1]
+            return (lo + int(np.argmax(head)) if head.max() > best else best_pos), lo + j
+        if w.max() > best:
+            best, best_pos = w.max(), lo + int(np.argmax(w))
+        lo, width = lo + width, width * 2
+    return best_pos, None
+
+
+def turning_points(angle, threshold=DEFAULT_THRESHOLD):
+    # -> (valley indices, peak indices) in time order; same rule as _ZigZag, but Python only
+    # loops once per turning point and scans the candidates between them with NumPy
+    angle = np.asarray(angle, dtype=float)
+    candidates = _candidates(angle)
+    x = angle[candidates]
+    turns = {"valley": [], "peak": []}
+    settled = _settle(x, threshold) if len(x) else None
+    if settled:
+        kind, extreme, pos = settled
+        turns[kind].append(extreme)
+        direction = 1 if kind == "valley" else -1
+        while True:
+            extreme, confirm = _next_turn(x, pos, direction, threshold)
+            # At the end of the recording the pending extreme counts as a turning point too
+            turns["peak" if direction > 0 else "valley"].append(extreme)
+            if confirm is None:
+                break
+            direction, pos = -direction, confirm
+    return (candidates[np.array(turns["valley"], dtype=int)].astype(int),
+            candidates[np.array(turns["peak"], dtype=int)].astype(int))
+
+
+def detect_reps(angle, rate_hz=DEFAULT_RATE_HZ, threshold=DEFAULT_THRESHOLD):
+    # Batch path -> {field: array} with one entry per repetition
+    angle = np.asarray(angle, dtype=float)
+    valleys, peaks = turning_points(angle, threshold)
+    empty = {field: np.empty(0, dtype=int if field in ("start", "peak", "end") else float) for field in REP_FIELDS}
+    if len(valleys) < 2 or len(peaks) == 0:
+        return empty
+
+    # Pair each valley with the first peak after it and keep those followed by another valley
+    starts = valleys[:-1]
+    ends = valleys[1:]
+    pick = np.searchsorted(peaks, starts)
+    valid = pick < len(peaks)
+    starts, ends, pick = starts[valid], ends[valid], pick[valid]
+    rep_peaks = peaks[pick]
+    keep = rep_peaks < ends
+    starts, ends, rep_peaks = starts[keep], ends[keep], rep_peaks[keep]
+    if len(starts) == 0:
+        return empty
+
+    # Max speed over each [start, end) slice in one reduceat over interleaved bounds
+    speed = np.append(np.abs(np.diff(angle)) * rate_hz, 0.0)  # speed[k] is between samples k and k + 1
+    peak_velocity = np.maximum.reduceat(speed, np.column_stack([starts, ends]).ravel())[::2]
+    return {
+        "start": starts,
+        "peak": rep_peaks,
+        "end": ends,
+        "rom": angle[rep_peaks] - np.minimum(angle[starts], angle[ends]),
+        "peak_velocity": peak_velocity,
+        "duration": (ends - starts) / rate_hz,
+    }
+
+
+def summarize(reps):
+    # Headline numbers for the patient's Done screen and the doctor views
+    n = len(reps["rom"])
+    return {
+        "reps": n,
+        "mean_rom": float(np.mean(reps["rom"])) if n else 0.0,
+        "max_rom": float(np.max(reps["rom"])) if n else 0.0,
+        "peak_velocity": float(np.max(reps["peak_velocity"])) if n else 0.0,
+        "mean_duration": float(np.mean(reps["duration"])) if n else 0.0,
+    }
+
+
+class RepCounter:
+    # Online path: O(1) work per sample, for live streams
+
+    def __init__(self, rate_hz=DEFAULT_RATE_HZ, threshold=DEFAULT_THRESHOLD):
+        self.rate_hz = rate_hz
+        self._zigzag = _ZigZag(threshold)
+        self._index = -1
+        self._previous = None
+        self._valley = None  # (index, value) of the last confirmed valley
+        self._peak = None  # (index, value) of the peak confirmed after that valley
+        self._segment_speed = 0.0  # max speed from the last valley up to the current candidate extreme
+        self._tail_speed = 0.0  # max speed after the current candidate extreme
+        self.count = 0
+        self.last = None
+        self.rom_total = 0.0
+        self.rom_max = 0.0
+
+    def update(self, value):
+        # Feed one angle sample; returns the repetition it completes, if any
+        self._index += 1
+        speed = 0.0 if self._previous is None else abs(value - self._previous) * self.rate_hz
+        self._previous = value
+        zigzag = self._zigzag
+        settling = zigzag.direction == 0
+        turned = zigzag.update(self._index, value)
+
+        if turned is None:
+            # While the direction is unknown the running low is the valley candidate
+            candidate = zigzag.low if settling else zigzag.extreme
+            if candidate[0] == self._index:
+                if not settling:
+                    self._segment_speed = max(self._segment_speed, self._tail_speed, speed)
+                self._tail_speed = 0.0
+            else:
+                self._tail_speed = max(self._tail_speed, speed)
+            return None
+
+        # The confirming sample becomes the next candidate extreme
+        self._tail_speed = max(self._tail_speed, speed)
+        kind, index, extreme = turned
+        rep = None
+        if kind == "peak":
+            if self._valley is not None:
+                self._peak = (index, extreme)
+            self._segment_speed = max(self._segment_speed, self._tail_speed)
+        else:
+            rep = self._complete(index, extreme)
+            self._segment_speed = self._tail_speed
+        self._tail_speed = 0.0
+        return rep
+
+    def _complete(self, index, value):
+        # A valley was confirmed at index; closes a repetition if a valley and peak precede it
+        rep = None
+        if self._valley is not None and self._peak is not None:
+            start, start_value = self._valley
+            rep = {
+                "start": start,
+                "peak": self._peak[0],
+                "end": index,
+                "rom": self._peak[1] - min(start_value, value),
+                "peak_velocity": self._segment_speed,
+                "duration": (index - start) / self.rate_hz,
+            }
+            self.count += 1
+            self.last = rep
+            self.rom_total += rep["rom"]
+            self.rom_max = max(self.rom_max, rep["rom"])
+        self._valley, self._peak = (index, value), None
+        return rep
+
+    def finish(self):
+        # Call once when the stream ends; may complete a final repetition
+        pending = self._zigzag.finish()
+        if pending is None or pending[0] != "valley":
+            return None
+        index = pending[1]
+        self._zigzag.direction = 0
+        return self._complete(index, pending[2])
@@ -0,0 +1,46 @@
+import streamlit as st
+
+from rehab.users import ROSTER_PAGE_SIZE
+
+# Doctor's patient picker: search box, injury type and start date filters, and one page of
+# results at a time. Only the visible page is fetched from the user store on each rerun.
+LABELS = {
+    "en": {"search": "Search patients", "injury": "Injury type", "all": "All", "started": "Start date between",
+           "page": "Page", "select": "Select a patient", "none": "No matching patients.",
+           "count": "{first}-{last} of {total} patients"},
+    "zh": {"search": "搜索患者", "injury": "伤情类型", "all": "全部", "started": "康复开始日期范围",
+           "page": "页码", "select": "选择患者", "none": "没有符合条件的患者。",
+           "count": "第 {first}-{last} 位，共 {total} 位患者"},
+}
+
+
+def patient_roster(users, doctor, key, container=None, lang="en", page_size=ROSTER_PAGE_SIZE):
+    # Returns the selected patient's record (same shape as UserStore.get) or None
+    text = LABELS[lang]
+    with container or st.container():
+        query = st.text_input(text["search"], key=f"{key}_query")
+        injury = st.selectbox(text["injury"], [text["all"]] + users.injury_types(doctor), key=f"{key}_injury")
+        started = st.date_input(text["started"], value=(), key=f"{key}_started")
+        started_from = started[0] if len(started) > 0 else None
+        started_to = started[1] if len(started) > 1 else None
+        injury_type = None if injury == text["all"] else injury
+
+        # Any filter change goes back to the first page
+        filters = (query, injury_type, started_from, started_to)
+        if st.session_state.get(f"{key}_filters") != filters:
+            st.session_state[f"{key}_filters"] = filters
+            st.session_state[f"{key}_page"] = 1
+        page = st.session_state.get(f"{key}_page", 1)
+        patients, total = users.roster(doctor, query, injury_type, started_from, started_to, page - 1, page_size)
+        if total == 0:
+            st.info(text["none"])
+            return None
+        n_pages = -(-total // page_size)
+        if n_pages > 1:
+            # The widget's value is the page fetched above (same session_state key)
+            st.number_input(f"{text['page']} (1-{n_pages})", min_value=1, max_value=n_pages, step=1, key=f"{key}_page")
+        first = (page - 1) * page_size + 1
+        st.caption(text["count"].format(first=first, last=first + len(patients) - 1, total=total))
+        by_name = {patient["username"]: patient for patient in patients}
+        selected = st.radio(text["select"], list(by_name), key=f"{key}_selected")
+    return by_name.get(selected)
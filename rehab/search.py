@@ -0,0 +1,70 @@
+from bisect import bisect_left
+
+import numpy as np
+
+# In-memory name search for short identifiers (icon names, usernames). Prefix queries are
+# a binary search over the sorted names; substring queries intersect n-gram posting lists
+# so a keystroke touches only candidate names instead of scanning all of them.
+GRAM = 3
+
+
+def read_names(path):
+    # One name per line; extra columns (e.g. a .codepoints file's "name code") are ignored
+    with open(path, "r", encoding="utf-8") as file:
+        return sorted({line.split()[0] for line in file if line.strip()})
+
+
+def _grams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class NgramIndex:
+    def __init__(self, names, gram=GRAM):
+        self.names = sorted(set(names))
+        self._lower = [name.lower() for name in self.names]
+        self._sorted_lower = sorted(range(len(self.names)), key=self._lower.__getitem__)
+        self._keys = [self._lower[i] for i in self._sorted_lower]
+        self.gram = gram
+        # Postings for every gram length up to `gram`, so 1- and 2-character queries are indexed too
+        postings = {}
+        for i, name in enumerate(self._lower):
+            for n in range(1, gram + 1):
+                for g in _grams(name, n):
+                    postings.setdefault(g, []).append(i)
+        self._postings = {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def prefix(self, query):
+        # Indices of names starting with query, alphabetical
+        query = query.lower()
+        lo = bisect_left(self._keys, query)
+        hi = bisect_left(self._keys, query + "￿")
+        return self._sorted_lower[lo:hi]
+
+    def substring(self, query):
+        # Indices of names containing query, alphabetical
+        query = query.lower()
+        if len(query) <= self.gram:
+            return self._postings.get(query, np.empty(0, dtype=np.int32)).tolist()
+        candidates = None
+        for g in sorted(_grams(query, self.gram), key=lambda g: len(self._postings.get(g, ()))):
+            ids = self._postings.get(g)
+            if ids is None:
+                return []
+            candidates = ids if candidates is None else np.intersect1d(candidates, ids, assume_unique=True)
+            if len(candidates) == 0:
+                return []
+        # Grams can match out of order; confirm the actual substring on the survivors
+        return [i for i in candidates.tolist() if query in self._lower[i]]
+
+    def search(self, query):
+        # Prefix matches first, then the remaining substring matches; empty query returns everything
+        query = query.strip()
+        if not query:
+            return self.names
+        first = self.prefix(query)
+        seen = set(first)
+        rest = [i for i in self.substring(query) if i not in seen]
+        return [self.names[i] for i in first + rest]
@@ -0,0 +1,113 @@
+import json
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+from rehab.db import Database
+
+# Finished training sessions, partitioned on disk as <root>/<patient>/<YYYY-MM-DD>/<session id>/
+# with meta.json and one .npy per stream column. A small SQLite index of start/end times
+# maps a patient and time range straight to the partitions to open, so nothing is scanned.
+# A session directory is written under a temporary name and renamed into place before its
+# index row is committed: readers only ever see complete sessions.
+SESSION_DIR = os.environ.get("REHAB_SESSION_DIR", "data/sessions")
+
+SESSION_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    id TEXT PRIMARY KEY,
+    patient TEXT NOT NULL,
+    day TEXT NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    exercise TEXT,
+    video_index INTEGER,
+    path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS sessions_patient_start ON sessions (patient, start);
+"""
+
+
+def _partition(patient, day):
+    # Usernames are free text; percent-encode them so each maps to exactly one directory
+    return os.path.join(quote(patient, safe=""), day)
+
+
+def _escape(name):
+    # Stream and column names come from the ingest header; percent-encode them (dots too, which
+    # separate the two in a file name) so "../x" stays inside the session directory
+    return quote(name, safe="").replace(".", "%2E")
+
+
+class SessionStore(Database):
+    SCHEMA = SESSION_SCHEMA
+
+    def __init__(self, root=SESSION_DIR):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        super().__init__(os.path.join(root, "index.db"))
+
+    def append(self, patient, streams, start, end, exercise=None, video_index=None, meta=None):
+        # streams: {stream name: {column: array}}; start/end are datetimes
+        day = start.date().isoformat()
+        session_id = f"{start:%H%M%S}-{uuid.uuid4().hex[:8]}"
+        rel = os.path.join(_partition(patient, day), session_id)
+        target = os.path.join(self.root, rel)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        tmp = tempfile.mkdtemp(dir=os.path.dirname(target), prefix=".tmp-")
+        try:
+            for stream, columns in streams.items():
+                for column, values in columns.items():
+                    np.save(os.path.join(tmp, f"{_escape(stream)}.{_escape(column)}.npy"), np.ascontiguousarray(values))
+            info = dict(meta or {}, id=session_id, patient=patient, start=start.isoformat(), end=end.isoformat(),
+                        duration=(end - start).total_seconds(), exercise=exercise, video_index=video_index,
+                        streams={stream: sorted(columns) for stream, columns in streams.items()})
+            with open(os.path.join(tmp, "meta.json"), "w") as file:
+                json.dump(info, file, ensure_ascii=False, indent=1)
+            os.rename(tmp, target)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO sessions VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (session_id, patient, day, start.timestamp(), end.timestamp(), exercise, video_index, rel),
+            )
+        return session_id
+
+    def query(self, patient, since=None, until=None):
+        # Sessions overlapping [since, until], oldest first; only the index is read
+        rows = self._connection().execute(
+            """SELECT * FROM sessions
+               WHERE patient = ? AND end >= ? AND start <= ?
+               ORDER BY start""",
+            (patient, since.timestamp() if since else float("-inf"), until.timestamp() if until else float("inf")),
+        ).fetchall()
+        return [
+            dict(row, start=datetime.fromtimestamp(row["start"]), end=datetime.fromtimestamp(row["end"]),
+                 path=os.path.join(self.root, row["path"]))
+            for row in rows
+        ]
+
+    def recent(self, patient, days=7, now=None):
+        now = now or datetime.now()
+        return self.query(patient, now - timedelta(days=days), now)
+
+    def meta(self, session):
+        with open(os.path.join(session["path"], "meta.json"), "r") as file:
+            return json.load(file)
+
+    def load(self, session):
+        # {stream: {column: read-only memory-mapped array}}
+        streams = {}
+        for name in sorted(os.listdir(session["path"])):
+            if name.endswith(".npy"):
+                stream, column = map(unquote, name[:-4].rsplit(".", 1))
+                streams.setdefault(stream, {})[column] = np.load(os.path.join(session["path"], name), mmap_mode="r")
+        return streams
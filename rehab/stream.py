@@ -0,0 +1,205 @@
+import argparse
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from rehab.ingest import parse_clock
+
+# Live ingestion: sensors (or rehab.replay) connect over TCP, send one header line
+# "<patient> <sensor>" and then HumeralMonitor-shaped lines "time x y z w".
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = int(os.environ.get("REHAB_INGEST_PORT", "9750"))
+DEFAULT_CAPACITY = 6000  # 60 s at 100 Hz per sensor
+READ_CHUNK = 64 * 1024
+
+
+def clock_now():
+    # Seconds since local midnight, the same clock as the recording timestamps
+    now = datetime.now()
+    return now.hour * 3600 + now.minute * 60 + now.second + now.microsecond / 1e6
+
+
+class RingBuffer:
+    # Fixed-size sample buffer. Every sample is written twice (at i and i + capacity),
+    # so the newest n samples are always one contiguous slice. The ingest loop writes while
+    # pages read, so writes and copies of a window happen under one lock and t and q always match.
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._t = np.zeros(2 * capacity)
+        self._q = np.zeros((2 * capacity, 4))
+        self.written = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return min(self.written, self.capacity)
+
+    def extend(self, t, q):
+        t, q = t[-self.capacity:], q[-self.capacity:]
+        with self._lock:
+            pos = (self.written + np.arange(len(t))) % self.capacity
+            for offset in (0, self.capacity):
+                self._t[pos + offset] = t
+                self._q[pos + offset] = q
+            self.written += len(t)
+
+    def latest(self, n=None, since=None):
+        # Copies of the newest n samples (oldest first), optionally only those with t >= since
+        with self._lock:
+            n = len(self) if n is None else min(n, len(self))
+            end = (self.written - 1) % self.capacity + self.capacity + 1 if self.written else 0
+            t, q = self._t[end - n:end], self._q[end - n:end]
+            if since is not None:
+                keep = t >= since
+                return t[keep], q[keep]
+            return t.copy(), q.copy()
+
+
+class SampleStore:
+    # One ring buffer per (patient, sensor)
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def buffer(self, patient, sensor):
+        with self._lock:
+            key = (patient, sensor)
+            if key not in self._buffers:
+                self._buffers[key] = RingBuffer(self.capacity)
+            return self._buffers[key]
+
+    def patients(self):
+        return sorted({patient for patient, _ in list(self._buffers)})
+
+    def sensors(self, patient):
+        return sorted(sensor for p, sensor in list(self._buffers) if p == patient)
+
+    def window(self, patient, sensor, n=None):
+        return self.buffer(patient, sensor).latest(n)
+
+    def capture(self, patient, since):
+        # {sensor: {"t", "q"}} copies of the patient's buffered samples at or after `since`
+        # (seconds of day); only what is still in the ring buffers is available
+        streams = {}
+        for sensor in self.sensors(patient):
+            t, q = self.buffer(patient, sensor).latest(since=since)
+            if len(t):
+                streams[sensor] = {"t": t, "q": q}
+        return streams
+
+
+def parse_lines(lines):
+    # b"time x y z w" lines -> (t, q) with q w-first, matching rehab.ingest.read_monitor
+    fields = [line.split() for line in lines]
+    fields = [f for f in fields if len(f) == 5]
+    if not fields:
+        return np.empty(0), np.empty((0, 4))
+    t = parse_clock([f[0].decode() for f in fields])
+    xyzw = np.array([f[1:] for f in fields], dtype=float)
+    return t, xyzw[:, [3, 0, 1, 2]]
+
+
+class IngestServer:
+    def __init__(self, store, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.store = store
+        self.host = host
+        self.port = port
+        self.stats = {"connections": 0, "samples": 0, "bytes": 0, "chunks": 0,
+                      "process_seconds": 0.0, "lag_seconds": 0.0, "max_lag_seconds": 0.0}
+        self._server = None
+
+    async def _handle(self, reader, writer):
+        self.stats["connections"] += 1
+        try:
+            header = (await reader.readline()).split()
+            if len(header) != 2:
+                return
+            buf = self.store.buffer(header[0].decode(), header[1].decode())
+            pending = b""
+            while True:
+                # One chunk is fully stored before the next read, so a slow consumer
+                # pushes back on the sender through TCP flow control
+                chunk = await reader.read(READ_CHUNK)
+                if not chunk:
+                    break
+                started = time.perf_counter()
+                lines = (pending + chunk).split(b"\n")
+                pending = lines.pop()
+                t, q = parse_lines(lines)
+                if len(t):
+                    buf.extend(t, q)
+                    lag = clock_now() - t[-1]
+                    self.stats["lag_seconds"] = lag
+                    self.stats["max_lag_seconds"] = max(self.stats["max_lag_seconds"], lag)
+                self.stats["samples"] += len(t)
+                self.stats["bytes"] += len(chunk)
+                self.stats["chunks"] += 1
+                self.stats["process_seconds"] += time.perf_counter() - started
+        finally:
+            self.stats["connections"] -= 1
+            writer.close()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        return self
+
+    async def serve_forever(self):
+        await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+
+_running = {}  # (host, port) -> server started in this process
+
+
+def start_in_thread(store, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    # Run the server on its own event loop in a daemon thread (e.g. inside the Streamlit process)
+    server = IngestServer(store, host, port)
+    loop = asyncio.new_event_loop()
+    loop.run_until_complete(server.start())
+    threading.Thread(target=loop.run_forever, daemon=True, name="rehab-ingest").start()
+    _running[(host, port)] = server
+    return server
+
+
+def running_store(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    # The store behind a server started by start_in_thread, or None; never starts one
+    server = _running.get((host, port))
+    return server.store if server else None
+
+
+async def _report(server, every):
+    last = 0
+    while True:
+        await asyncio.sleep(every)
+        s = server.stats
+        rate = (s["samples"] - last) / every
+        last = s["samples"]
+        per_sample_us = 1e6 * s["process_seconds"] / max(s["samples"], 1)
+        print(f"{rate:10.0f} samples/s  total={s['samples']}  connections={s['connections']}  "
+              f"process={per_sample_us:.2f} us/sample  lag={s['lag_seconds'] * 1000:.1f} ms  "
+              f"max_lag={s['max_lag_seconds'] * 1000:.1f} ms", flush=True)
+
+
+async def _main(args):
+    server = IngestServer(SampleStore(args.capacity), args.host, args.port)
+    print(f"Listening on {args.host}:{args.port}", flush=True)
+    await asyncio.gather(server.serve_forever(), _report(server, args.report_every))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the live IMU ingestion server.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY)
+    parser.add_argument("--report-every", type=float, default=5.0)
+    try:
+        asyncio.run(_main(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
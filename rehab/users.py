@@ -0,0 +1,222 @@
+import json
+import os
+import sqlite3
+from datetime import date
+
+from rehab.db import Database
+
+# Account storage with single-row writes instead of rewriting the whole user file.
+USER_DB_FILE = os.environ.get("REHAB_USER_DB", "user_data.db")
+LEGACY_JSON_FILE = "user_data.json"
+
+USER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    password TEXT NOT NULL,
+    role TEXT NOT NULL,
+    doctor_id TEXT,
+    injury_type TEXT,
+    age INTEGER,
+    gender TEXT,
+    start_date TEXT
+);
+CREATE INDEX IF NOT EXISTS users_role_doctor_id ON users (role, doctor_id);
+CREATE TABLE IF NOT EXISTS doctor_patients (
+    doctor TEXT NOT NULL REFERENCES users (username),
+    patient TEXT NOT NULL REFERENCES users (username),
+    UNIQUE (doctor, patient)
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+# Trigram full-text index over patient usernames for the doctor's roster search (substring
+# matches of 3+ characters); kept in step with registrations. Needs SQLite built with FTS5.
+NAME_INDEX_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS patient_names USING fts5 (username, tokenize = 'trigram');
+"""
+
+PATIENT_FIELDS = ["injury_type", "age", "gender", "start_date"]
+ROSTER_PAGE_SIZE = 20
+
+
+def _escape_like(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class UserExistsError(ValueError):
+    pass
+
+
+class UnknownDoctorError(ValueError):
+    pass
+
+
+class UserStore(Database):
+    SCHEMA = USER_SCHEMA
+
+    def __init__(self, path=USER_DB_FILE, legacy_json=LEGACY_JSON_FILE):
+        super().__init__(path)
+        try:
+            self._connection().executescript(NAME_INDEX_SCHEMA)
+            self.name_index = True
+        except sqlite3.OperationalError:
+            # No FTS5: roster search falls back to LIKE over the doctor's patients
+            self.name_index = False
+        if legacy_json and os.path.exists(legacy_json):
+            self.migrate_json(legacy_json)
+        if self.name_index:
+            self._index_names()
+
+    def _index_names(self):
+        # Backfill the name index once for databases created before it existed
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'patient_names'").fetchone():
+                return
+            conn.execute("DELETE FROM patient_names")
+            conn.execute("INSERT INTO patient_names (username) SELECT username FROM users WHERE role = 'Patient'")
+            conn.execute("INSERT INTO meta VALUES ('patient_names', '1')")
+
+    def migrate_json(self, json_path):
+        # One-time import of the old user_data.json; later calls are no-ops
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'migrated_json'").fetchone():
+                return
+            try:
+                with open(json_path, "r") as file:
+                    legacy = json.load(file)
+            except (FileNotFoundError, json.JSONDecodeError):
+                legacy = {}
+            for username, data in legacy.items():
+                conn.execute(
+                    "INSERT OR IGNORE INTO users VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (username, data["password"], data["role"], data.get("doctor_id"),
+                     *[data.get(field) for field in PATIENT_FIELDS]),
+                )
+            for username, data in legacy.items():
+                for patient in data.get("patients", []):
+                    if patient in legacy:
+                        conn.execute("INSERT OR IGNORE INTO doctor_patients VALUES (?, ?)", (username, patient))
+            conn.execute("INSERT INTO meta VALUES ('migrated_json', ?)", (json_path,))
+
+    def _as_user(self, conn, row):
+        # Same shape as the old JSON records, except that a doctor's patient list is not loaded
+        # here: it changes as patients register, so pages query it (roster, has_patients) instead
+        user = {"username": row["username"], "password": row["password"], "role": row["role"],
+                "doctor_id": row["doctor_id"]}
+        if row["role"] == "Doctor":
+            user["start_date"] = None
+        else:
+            user.update({field: row[field] for field in PATIENT_FIELDS})
+            if user["start_date"]:
+                user["start_date"] = date.fromisoformat(user["start_date"])
+        return user
+
+    def _patients(self, conn, doctor):
+        rows = conn.execute("SELECT patient FROM doctor_patients WHERE doctor = ? ORDER BY rowid", (doctor,))
+        return [row["patient"] for row in rows]
+
+    def get(self, username):
+        conn = self._connection()
+        row = conn.execute("SELECT * FROM users WHERE username = ?", (username,)).fetchone()
+        return self._as_user(conn, row) if row else None
+
+    def exists(self, username):
+        row = self._connection().execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone()
+        return row is not None
+
+    def find_doctors(self, doctor_id):
+        return self._find_doctors(self._connection(), doctor_id)
+
+    def _find_doctors(self, conn, doctor_id):
+        # doctor_id is not unique: like the JSON store, a patient is linked to every doctor sharing it
+        rows = conn.execute("SELECT username FROM users WHERE role = 'Doctor' AND doctor_id = ? ORDER BY rowid",
+                            (doctor_id,))
+        return [row["username"] for row in rows]
+
+    def patients_of(self, doctor):
+        return self._patients(self._connection(), doctor)
+
+    def has_patients(self, doctor):
+        row = self._connection().execute("SELECT 1 FROM doctor_patients WHERE doctor = ? LIMIT 1", (doctor,)).fetchone()
+        return row is not None
+
+    def get_many(self, usernames):
+        usernames = list(usernames)
+        if not usernames:
+            return {}
+        conn = self._connection()
+        placeholders = ", ".join("?" * len(usernames))
+        rows = conn.execute(f"SELECT * FROM users WHERE username IN ({placeholders})", usernames).fetchall()
+        return {row["username"]: self._as_user(conn, row) for row in rows}
+
+    def register_doctor(self, username, password, doctor_id):
+        with self._transaction() as conn:
+            self._insert(conn, (username, password, "Doctor", doctor_id, None, None, None, None))
+
+    def register_patient(self, username, password, doctor_id, injury_type, age, gender, start_date):
+        with self._transaction() as conn:
+            doctors = self._find_doctors(conn, doctor_id)
+            if not doctors:
+                raise UnknownDoctorError(doctor_id)
+            self._insert(conn, (username, password, "Patient", doctor_id, injury_type, age, gender, str(start_date)))
+            conn.executemany("INSERT INTO doctor_patients VALUES (?, ?)", [(doctor, username) for doctor in doctors])
+            if self.name_index:
+                conn.execute("INSERT INTO patient_names (username) VALUES (?)", (username,))
+
+    def _roster_filter(self, doctor, query, injury_type, started_from, started_to):
+        where = ["dp.doctor = ?"]
+        params = [doctor]
+        if injury_type:
+            where.append("u.injury_type = ?")
+            params.append(injury_type)
+        if started_from:
+            where.append("u.start_date >= ?")
+            params.append(str(started_from))
+        if started_to:
+            where.append("u.start_date <= ?")
+            params.append(str(started_to))
+        if query and self.name_index and len(query) >= 3:
+            where.append("dp.patient IN (SELECT username FROM patient_names WHERE patient_names MATCH ?)")
+            params.append('"' + query.replace('"', '""') + '"')
+        elif query:
+            where.append("dp.patient LIKE ? ESCAPE '\\'")
+            params.append("%" + _escape_like(query) + "%")
+        return " AND ".join(where), params
+
+    def roster(self, doctor, query="", injury_type=None, started_from=None, started_to=None,
+               page=0, page_size=ROSTER_PAGE_SIZE):
+        # One page of a doctor's patients plus the total match count. Prefix matches on the
+        # name come first, then roster order; only the rows on the page are read.
+        query = query.strip()
+        where, params = self._roster_filter(doctor, query, injury_type, started_from, started_to)
+        conn = self._connection()
+        total = conn.execute(
+            f"SELECT count(*) FROM doctor_patients AS dp JOIN users AS u ON u.username = dp.patient WHERE {where}",
+            params,
+        ).fetchone()[0]
+        rows = conn.execute(
+            f"""SELECT u.* FROM doctor_patients AS dp JOIN users AS u ON u.username = dp.patient
+                WHERE {where}
+                ORDER BY dp.patient LIKE ? ESCAPE '\\' DESC, dp.rowid
+                LIMIT ? OFFSET ?""",
+            params + [_escape_like(query) + "%", page_size, page * page_size],
+        ).fetchall()
+        return [self._as_user(conn, row) for row in rows], total
+
+    def injury_types(self, doctor):
+        rows = self._connection().execute(
+            """SELECT DISTINCT u.injury_type FROM doctor_patients AS dp JOIN users AS u ON u.username = dp.patient
+               WHERE dp.doctor = ? AND u.injury_type IS NOT NULL ORDER BY u.injury_type""",
+            (doctor,),
+        )
+        return [row["injury_type"] for row in rows]
+
+    def _insert(self, conn, values):
+        try:
+            conn.execute("INSERT INTO users VALUES (?, ?, ?, ?, ?, ?, ?, ?)", values)
+        except sqlite3.IntegrityError:
+            raise UserExistsError(values[0])
+
@@ -0,0 +1,144 @@
+import argparse
+import glob
+import json
+import os
+import shutil
+import subprocess
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Exercise video catalog. Clips come from videos/manifest.json when present, otherwise
+# from every .mp4 in videos/ in name order. Lower-bitrate renditions and poster
+# thumbnails live in videos/renditions/ and are generated offline with `build`.
+VIDEO_DIR = "videos"
+MANIFEST_FILE = "manifest.json"
+RENDITION_DIR = "renditions"
+CLIP_CACHE_ENTRIES = 16
+PREFETCH_WORKERS = 2
+RENDITIONS = {"480p": ["-vf", "scale=-2:480", "-c:v", "libx264", "-crf", "28", "-preset", "veryfast",
+                       "-c:a", "aac", "-b:a", "96k", "-movflags", "+faststart"]}
+
+
+def _clip(root, filename, title=None):
+    stem = os.path.splitext(filename)[0]
+    rendition_root = os.path.join(root, RENDITION_DIR)
+    renditions = {"original": os.path.join(root, filename)}
+    for name in RENDITIONS:
+        path = os.path.join(rendition_root, f"{stem}-{name}.mp4")
+        if os.path.exists(path):
+            renditions[name] = path
+    poster = os.path.join(rendition_root, f"{stem}.jpg")
+    return {
+        "id": stem,
+        "title": title or stem,
+        "path": os.path.join(root, filename),
+        "renditions": renditions,
+        "poster": poster if os.path.exists(poster) else None,
+    }
+
+
+def scan_catalog(root=VIDEO_DIR):
+    manifest = os.path.join(root, MANIFEST_FILE)
+    if os.path.exists(manifest):
+        with open(manifest, "r") as file:
+            entries = json.load(file)
+        clips = [_clip(root, entry["file"], entry.get("title")) for entry in entries]
+        return [clip for clip in clips if os.path.exists(clip["path"])]
+    files = sorted(os.path.basename(p) for p in glob.glob(os.path.join(root, "*.mp4")))
+    return [_clip(root, filename) for filename in files]
+
+
+def catalog_version(root=VIDEO_DIR):
+    # Changes whenever a clip, rendition or the manifest is added, removed or edited
+    paths = glob.glob(os.path.join(root, "*")) + glob.glob(os.path.join(root, RENDITION_DIR, "*"))
+    return tuple(sorted((p, os.path.getmtime(p)) for p in paths if os.path.isfile(p)))
+
+
+def read_clip(path):
+    with open(path, "rb") as file:
+        return file.read()
+
+
+class ClipCache:
+    # Clip bytes keyed by (path, mtime), shared by every session; each clip is read at most once.
+    # prefetch() queues the read on a small background pool. get() never waits behind that queue:
+    # hits return at once, and a miss (or a prefetch still queued) is read on the caller's thread.
+    # The workers only call read_clip, never Streamlit, so they need no script run context.
+
+    def __init__(self, max_entries=CLIP_CACHE_ENTRIES, workers=PREFETCH_WORKERS):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (path, mtime) -> Future, least recently used first
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="rehab-video-prefetch")
+
+    def _store(self, key, future):
+        self._entries[key] = future
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def prefetch(self, path):
+        # Warm the next clip so "Next" does not wait on disk; a no-op once it is queued or cached
+        key = (path, os.path.getmtime(path))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+            else:
+                self._store(key, self._pool.submit(read_clip, path))
+
+    def get(self, path):
+        key = (path, os.path.getmtime(path))
+        with self._lock:
+            future = self._entries.get(key)
+            # cancel() only succeeds for a prefetch that has not started yet
+            owner = future is None or future.cancel()
+            if owner:
+                future = Future()
+                future.set_running_or_notify_cancel()
+                self._store(key, future)
+            else:
+                self._entries.move_to_end(key)
+        if owner:
+            try:
+                future.set_result(read_clip(path))
+            except OSError as exc:
+                future.set_exception(exc)
+        try:
+            return future.result()
+        except OSError:
+            # Do not keep a failed read around; the next call tries the disk again
+            with self._lock:
+                if self._entries.get(key) is future:
+                    del self._entries[key]
+            raise
+
+
+def build_renditions(root=VIDEO_DIR, force=False):
+    # Offline step: needs ffmpeg on PATH; skips outputs that are newer than their source
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg is required to build renditions")
+    out_root = os.path.join(root, RENDITION_DIR)
+    os.makedirs(out_root, exist_ok=True)
+    for clip in scan_catalog(root):
+        source = clip["path"]
+        jobs = [(os.path.join(out_root, f"{clip['id']}-{name}.mp4"), args) for name, args in RENDITIONS.items()]
+        jobs.append((os.path.join(out_root, f"{clip['id']}.jpg"), ["-ss", "1", "-frames:v", "1", "-vf", "scale=320:-2"]))
+        for target, args in jobs:
+            if not force and os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+                continue
+            print(f"{source} -> {target}", flush=True)
+            subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-i", source, *args, target], check=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Exercise video catalog tools.")
+    parser.add_argument("command", choices=["list", "build"])
+    parser.add_argument("--root", default=VIDEO_DIR)
+    parser.add_argument("--force", action="store_true", help="rebuild renditions even if up to date")
+    args = parser.parse_args()
+    if args.command == "build":
+        build_renditions(args.root, args.force)
+    else:
+        for clip in scan_catalog(args.root):
+            print(f"{clip['id']}: {clip['title']}  renditions={sorted(clip['renditions'])}  poster={clip['poster']}")
@@ -1,4 +1,6 @@
-from vpython import *
+import argparse
+import time
+
 import numpy as np
 
 # Constants
@@ -8,11 +10,11 @@ m = 1
 spacing = 1
 atom_radius = 0.3 * spacing
 dt = 0.04 * (2 * np.pi * np.sqrt(m / k))
+# Every bond used to be built twice (once from each end, one helix visible and one hidden),
+# and both applied their force, so each bond acts with twice the spring constant
+SPRINGS_PER_BOND = 2
 
-# Set up the scene
-scene = canvas()
-scene.center = vector(0.5 * (N - 1), 0.5 * (N - 1), 0.5 * (N - 1))
-scene.caption = """A model of a solid represented as atoms connected by interatomic bonds.
+CAPTION = """A model of a solid represented as atoms connected by interatomic bonds.
 
 To rotate "camera", drag with right button or Ctrl-drag.
 To zoom, drag with middle button or Alt/Option depressed, or use scroll wheel.
@@ -20,72 +22,114 @@ On a two-button mouse, middle is left + right.
 To pan left/right and up/down, Shift-drag.
 Touch screen: pinch/extend to zoom, swipe or two-finger rotate."""
 
+
+def neighbour_bonds(N):
+    # Flat atom indices (start, end) of every +x, +y and +z bond inside an N^3 grid
+    index = np.arange(N ** 3).reshape(N, N, N)  # index[z, y, x]
+    starts = [index[:, :, :-1], index[:, :-1, :], index[:-1, :, :]]
+    ends = [index[:, :, 1:], index[:, 1:, :], index[1:, :, :]]
+    return (np.concatenate([s.ravel() for s in starts]),
+            np.concatenate([e.ravel() for e in ends]))
+
+
 class Crystal:
-    def __init__(self, N, atom_radius, spacing, momentumRange):
-        self.atoms = []
-        self.springs = []
-        
-        # Create atoms
-        for z in range(-1, N + 1):
-            for y in range(-1, N + 1):
-                for x in range(-1, N + 1):
-                    atom = sphere(
-                        pos=vector(x, y, z) * spacing, 
-                        radius=atom_radius, 
-                        color=vector(0, 0.58, 0.69)
-                    )
-                    if 0 <= x < N and 0 <= y < N and 0 <= z < N:
-                        atom.momentum = momentumRange * vector(np.random.uniform(-1,1), np.random.uniform(-1,1), np.random.uniform(-1,1))
-                    else:
-                        atom.visible = False
-                        atom.momentum = vector(0, 0, 0)
-                    self.atoms.append(atom)
-
-        # Create springs
-        for atom in self.atoms:
-            if atom.visible:
-                neighbors = [
-                    (vector(1, 0, 0), True),
-                    (vector(0, 1, 0), True),
-                    (vector(0, 0, 1), True),
-                    (vector(-1, 0, 0), False),
-                    (vector(0, -1, 0), False),
-                    (vector(0, 0, -1), False)
-                ]
-                for direction, visible in neighbors:
-                    neighbor_pos = atom.pos + direction * spacing
-                    neighbor = next((a for a in self.atoms if a.pos == neighbor_pos and a.visible), None)
-                    if neighbor:
-                        self.make_spring(atom, neighbor, visible)
-
-    def make_spring(self, start, end, visible):
-        spring = helix(
-            pos=start.pos,
-            axis=end.pos - start.pos,
-            radius=0.2 * spacing,
-            thickness=0.05,
-            color=color.orange,
-            visible=visible
-        )
-        spring.start = start
-        spring.end = end
-        self.springs.append(spring)
-
-# Create the crystal lattice
-c = Crystal(N, atom_radius, spacing, 0.1 * spacing * np.sqrt(k / m))
-
-# Simulation loop
-while True:
-    rate(60)
-    for atom in c.atoms:
-        if atom.visible:
-            atom.pos += (atom.momentum / m) * dt
-    for spring in c.springs:
-        spring.axis = spring.end.pos - spring.start.pos
-        L = mag(spring.axis)
-        if L > 0:
-            Fdt = spring.axis.norm() * (k * dt * (1 - spacing / L))
-            if spring.start.visible:
-                spring.start.momentum += Fdt
-            if spring.end.visible:
-                spring.end.momentum -= Fdt
+    # State lives in (N, N, N, 3) arrays indexed [z, y, x]; neighbours are adjacent slices
+    def __init__(self, N, spacing, momentumRange, seed=None):
+        rng = np.random.default_rng(seed)
+        self.N = N
+        self.spacing = spacing
+        z, y, x = np.meshgrid(np.arange(N), np.arange(N), np.arange(N), indexing="ij")
+        self.pos = np.stack([x, y, z], axis=-1).astype(float) * spacing
+        self.momentum = momentumRange * rng.uniform(-1, 1, size=self.pos.shape)
+        self.steps = 0
+
+    def step(self, n=1):
+        pos, momentum = self.pos, self.momentum
+        for _ in range(n):
+            pos += (momentum / m) * dt
+            for axis in range(3):
+                lo = [slice(None)] * 3
+                hi = [slice(None)] * 3
+                lo[axis] = slice(None, -1)
+                hi[axis] = slice(1, None)
+                lo, hi = tuple(lo), tuple(hi)
+                bond = pos[hi] - pos[lo]
+                L = np.linalg.norm(bond, axis=-1, keepdims=True)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    Fdt = np.where(L > 0, bond * (SPRINGS_PER_BOND * k * dt * (1 / L - spacing / L ** 2)), 0.0)
+                momentum[lo] += Fdt
+                momentum[hi] -= Fdt
+        self.steps += n
+
+    def energy(self):
+        # Kinetic plus spring energy; should stay roughly constant
+        kinetic = 0.5 * np.sum(self.momentum ** 2) / m
+        flat = self.pos.reshape(-1, 3)
+        starts, ends = neighbour_bonds(self.N)
+        stretch = np.linalg.norm(flat[ends] - flat[starts], axis=1) - self.spacing
+        return kinetic + 0.5 * SPRINGS_PER_BOND * k * np.sum(stretch ** 2)
+
+
+class VPythonView:
+    # Optional renderer: VPython objects only mirror the arrays, they never hold state
+    def __init__(self, crystal, springs=True):
+        import vpython
+
+        self.vp = vpython
+        n = crystal.N
+        self.scene = vpython.canvas()
+        self.scene.center = vpython.vector(0.5 * (n - 1), 0.5 * (n - 1), 0.5 * (n - 1)) * crystal.spacing
+        self.scene.caption = CAPTION
+        flat = crystal.pos.reshape(-1, 3)
+        self.atoms = [
+            vpython.sphere(pos=vpython.vector(*p), radius=atom_radius, color=vpython.vector(0, 0.58, 0.69))
+            for p in flat
+        ]
+        self.starts, self.ends = neighbour_bonds(n) if springs else (np.empty(0, int), np.empty(0, int))
+        self.springs = [
+            vpython.helix(pos=vpython.vector(*flat[s]), axis=vpython.vector(*(flat[e] - flat[s])),
+                          radius=0.2 * crystal.spacing, thickness=0.05, color=vpython.color.orange)
+            for s, e in zip(self.starts, self.ends)
+        ]
+
+    def sync(self, crystal):
+        vector = self.vp.vector
+        flat = crystal.pos.reshape(-1, 3)
+        for atom, p in zip(self.atoms, flat.tolist()):
+            atom.pos = vector(*p)
+        axes = (flat[self.ends] - flat[self.starts]).tolist()
+        for spring, s, axis in zip(self.springs, flat[self.starts].tolist(), axes):
+            spring.pos = vector(*s)
+            spring.axis = vector(*axis)
+
+
+def benchmark(crystal, steps):
+    started = time.perf_counter()
+    e0 = crystal.energy()
+    crystal.step(steps)
+    elapsed = time.perf_counter() - started
+    print(f"N={crystal.N}: {steps} steps in {elapsed:.2f} s ({steps / elapsed:.1f} steps/s), "
+          f"energy drift {crystal.energy() / e0 - 1:+.2%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ball-and-spring crystal lattice.")
+    parser.add_argument("--n", type=int, default=N, help="grid size (N^3 atoms)")
+    parser.add_argument("--headless", action="store_true", help="no rendering; time --steps steps and exit")
+    parser.add_argument("--steps", type=int, default=1000)
+    parser.add_argument("--sync-every", type=int, default=1, help="simulation steps per rendered frame")
+    parser.add_argument("--no-springs", action="store_true", help="draw atoms only (large N)")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    # Create the crystal lattice
+    c = Crystal(args.n, spacing, 0.1 * spacing * np.sqrt(k / m), seed=args.seed)
+    if args.headless:
+        benchmark(c, args.steps)
+    else:
+        view = VPythonView(c, springs=not args.no_springs)
+        # Simulation loop
+        while True:
+            view.vp.rate(60)
+            c.step(args.sync_every)
+            view.sync(c)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 测试直接导入 rehab/，与 test/dashboard.py 一样把仓库根目录加入路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -1,43 +1,49 @@
+import os
+import sys
+
 import streamlit as st
-import requests
-
-# Fetch Material Icons list from Google's official repository
-@st.cache_data
-def get_material_icons():
-    url = "https://raw.githubusercontent.com/google/material-design-icons/master/font/MaterialIcons-Regular.codepoints"
-    response = requests.get(url)
-    if response.status_code == 200:
-        icons = response.text.split("\n")
-        icon_dict = {line.split()[0]: line.split()[1] for line in icons if line.strip()}
-        return icon_dict
-    else:
-        return {}
+
+# Run standalone (streamlit run test/dashboard.py): make the repo's rehab package importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from rehab.search import NgramIndex, read_names
+
+# Icon names bundled with the repo (one per line; a Google .codepoints file also works)
+ICONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "material_icons.txt")
+PAGE_SIZE = 60
+COLUMNS = 5
+
+# Build the search index once per process and share it across sessions
+@st.cache_resource
+def get_icon_index(path, mtime):
+    return NgramIndex(read_names(path))
 
 # Load the icons
-icons = get_material_icons()
+index = get_icon_index(ICONS_FILE, os.path.getmtime(ICONS_FILE))
 
 # Streamlit UI
 st.title("Material Icons Explorer")
 st.write("Search and explore Material Design Icons for use in Streamlit!")
 
 # Search box
-query = st.text_input("Search for an icon:", "").strip().lower()
+query = st.text_input("Search for an icon:", "", key="icon_query").strip().lower()
 
-# Filter icons based on query
-if query:
-    filtered_icons = {name: code for name, code in icons.items() if query in name.lower()}
-else:
-    filtered_icons = icons
+# Prefix matches first, then names containing the query
+filtered_icons = index.search(query)
 
-# Display results
+# Display results one page at a time
 if filtered_icons:
-    cols = st.columns(5)  # Display 5 icons per row
-    for idx, (icon_name, icon_code) in enumerate(filtered_icons.items()):
-        with cols[idx % 5]:
-            st.markdown(f":material/{icon_name}:")
-            st.write(icon_name)
+    n_pages = -(-len(filtered_icons) // PAGE_SIZE)
+    if st.session_state.get("icon_page_query") != query:
+        # New query: back to the first page
+        st.session_state["icon_page_query"] = query
+        st.session_state["icon_page"] = 1
+    page = st.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, step=1, key="icon_page")
+    start = (page - 1) * PAGE_SIZE
+    cols = st.columns(COLUMNS)  # Display 5 icons per row
+    for idx, icon_name in enumerate(filtered_icons[start:start + PAGE_SIZE]):
+        with cols[idx % COLUMNS]:
+            st.markdown(f":material/{icon_name}:  \n{icon_name}")
+    # Display total count
+    st.write(f"Showing {start + 1}-{min(start + PAGE_SIZE, len(filtered_icons))} of {len(filtered_icons)} icons.")
 else:
     st.warning("No icons found. Try a different keyword.")
-
-# Display total count
-st.write(f"Showing {len(filtered_icons)} icons.")
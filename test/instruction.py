@@ -1,10 +1,10 @@
-
+import os  # 本地数据缓存路径
 import time  # 用于模拟实时数据流
+import urllib.request  # 首次运行时下载数据集
 import numpy as np  # 用于数值计算
 import pandas as pd  # 处理 CSV 数据
 import plotly.express as px  # 交互式数据可视化
 import streamlit as st  # Streamlit Web 应用框架
-import uuid  # 用于生成唯一的 key，防止重复 ID 错误
 
 # 设置 Streamlit 页面配置
 st.set_page_config(
@@ -13,70 +13,137 @@ st.set_page_config(
     layout="wide",  # 采用宽屏布局
 )
 
-# 读取远程 CSV 数据的 URL
+# 远程 CSV 只下载一次，之后从本地缓存读取
 dataset_url = "https://raw.githubusercontent.com/Lexie88rus/bank-marketing-analysis/master/bank.csv"
+DATA_FILE = os.path.join(os.environ.get("REHAB_DATA_DIR", ".cache/datasets"), "bank.csv")
 
-# 使用 Streamlit 缓存机制缓存数据，避免重复下载
-@st.cache_data
-def get_data() -> pd.DataFrame:
-    return pd.read_csv(dataset_url)  # 读取 CSV 数据并返回 DataFrame
-
-df = get_data()  # 获取数据
-
-# 在页面上显示主标题
-st.title("Real-Time / Live Data Science Dashboard")
-
-# 添加下拉筛选器，用户可以选择职业类别
-job_filter = st.selectbox("Select the Job", pd.unique(df["job"]))
-
-# 创建一个占位符容器，用于实时更新数据
-placeholder = st.empty()
-
-# 根据筛选条件过滤数据
-df = df[df["job"] == job_filter]
-
-# 开始模拟实时数据流（循环 200 次，每次间隔 1 秒）
-for seconds in range(200):
+REFRESH_SECONDS = 1  # 实时区块的刷新间隔
+ROWS_PER_TICK = 5  # 每次刷新到达的新记录数
+LIVE_ROWS = 100  # 实时表格最多保留的记录数
 
-    # 生成新的列，模拟数据动态变化
-    df["age_new"] = df["age"] * np.random.choice(range(1, 5))  # 年龄数据乘以 1-4 之间的随机数
-    df["balance_new"] = df["balance"] * np.random.choice(range(1, 5))  # 账户余额数据变化
 
-    # 计算 KPI（关键指标）
-    avg_age = np.mean(df["age_new"])  # 计算平均年龄
+def ensure_dataset(path=DATA_FILE):
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        urllib.request.urlretrieve(dataset_url, tmp)
+        os.replace(tmp, path)
+    return path
 
-    # 计算已婚人数，并随机增加 1~30 之间的浮动值
-    count_married = int(df[df["marital"] == "married"]["marital"].count() + np.random.choice(range(1, 30)))
 
-    balance = np.mean(df["balance_new"])  # 计算账户平均余额
+# 所有会话共享同一份只读数据
+@st.cache_resource
+def get_data(path, mtime) -> pd.DataFrame:
+    return pd.read_csv(path)
 
-    with placeholder.container():  # 使用占位符，刷新整个数据区块
 
-        # 创建三列用于展示 KPI 指标
-        kpi1, kpi2, kpi3 = st.columns(3)
-
-        # 填充 KPI 指标数据
-        kpi1.metric(label="Age ⏳", value=round(avg_age), delta=round(avg_age) - 10)  # 显示平均年龄
-        kpi2.metric(label="Married Count 💍", value=int(count_married), delta=-10 + count_married)  # 已婚人数
-        kpi3.metric(label="A/C Balance ＄", value=f"$ {round(balance,2)} ", delta=-round(balance / count_married) * 100)  # 账户余额
-
-        # 创建两个列用于显示图表
-        fig_col1, fig_col2 = st.columns(2)
-
-        with fig_col1:
-            st.markdown("### First Chart")  # 图表标题
-            fig = px.density_heatmap(data_frame=df, y="age_new", x="marital")  # 生成热力图
-            st.plotly_chart(fig, use_container_width=True, key=f"heatmap_{uuid.uuid4()}")  # 生成唯一 key，避免冲突
-
-        with fig_col2:
-            st.markdown("### Second Chart")  # 图表标题
-            fig2 = px.histogram(data_frame=df, x="age_new")  # 生成直方图
-            st.plotly_chart(fig2, use_container_width=True, key=f"histogram_{uuid.uuid4()}")  # 生成唯一 key，避免冲突
-
-        # 显示详细数据表格
-        st.markdown("### Detailed Data View")
-        st.dataframe(df)  # 在页面上显示 DataFrame 数据表
-
-    time.sleep(0.01)  # 等待 1 秒，模拟实时数据流
+@st.cache_data
+def job_base(path, mtime, job):
+    # 每个职业的基础聚合只算一次；实时 KPI 只是在这些值上乘以本次的随机系数
+    rows = get_data(path, mtime)
+    rows = rows[rows["job"] == job].reset_index(drop=True)
+    return rows, {
+        "age": float(rows["age"].mean()),
+        "married": int((rows["marital"] == "married").sum()),
+        "balance": float(rows["balance"].mean()),
+    }
+
+
+def current_tick():
+    # 所有浏览者对齐到同一个刷新周期，同一周期内的计算结果共享
+    return int(time.time() // REFRESH_SECONDS)
+
+
+@st.cache_data(ttl=60, max_entries=256)
+def tick_factors(tick):
+    # 模拟数据动态变化：年龄、余额乘以 1-4 之间的随机数，已婚人数加 1~30 的浮动
+    rng = np.random.default_rng(tick)
+    return int(rng.choice(range(1, 5))), int(rng.choice(range(1, 5))), int(rng.choice(range(1, 30)))
+
+
+@st.cache_data(max_entries=64)
+def build_charts(path, mtime, job, age_factor):
+    # 图表只依赖职业和年龄系数，最多 4 种组合，系数不变时直接复用
+    rows = job_base(path, mtime, job)[0].assign(age_new=lambda d: d["age"] * age_factor)
+    heatmap = px.density_heatmap(data_frame=rows, y="age_new", x="marital")  # 生成热力图
+    histogram = px.histogram(data_frame=rows, x="age_new")  # 生成直方图
+    return heatmap.to_dict(), histogram.to_dict()
+
+
+try:
+    data_path = ensure_dataset()
+except OSError as exc:
+    st.error(f"无法下载数据集：{exc}")
+    st.stop()
+data_mtime = os.path.getmtime(data_path)
+df = get_data(data_path, data_mtime)  # 获取数据
 
+# 在页面上显示主标题
+st.title("Real-Time / Live Data Science Dashboard")
 
+# 添加下拉筛选器，用户可以选择职业类别
+job_filter = st.selectbox("Select the Job", pd.unique(df["job"]), key="job_filter")
+
+# 根据筛选条件过滤数据（按职业缓存）
+job_rows, base = job_base(data_path, data_mtime, job_filter)
+
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def kpi_panel():
+    age_factor, balance_factor, married_jitter = tick_factors(current_tick())
+    avg_age = base["age"] * age_factor  # 平均年龄
+    count_married = base["married"] + married_jitter  # 已婚人数
+    balance = base["balance"] * balance_factor  # 账户平均余额
+
+    # 创建三列用于展示 KPI 指标
+    kpi1, kpi2, kpi3 = st.columns(3)
+    kpi1.metric(label="Age ⏳", value=round(avg_age), delta=round(avg_age) - 10)  # 显示平均年龄
+    kpi2.metric(label="Married Count 💍", value=int(count_married), delta=-10 + count_married)  # 已婚人数
+    kpi3.metric(label="A/C Balance ＄", value=f"$ {round(balance,2)} ", delta=-round(balance / count_married) * 100)  # 账户余额
+
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def chart_panel():
+    age_factor = tick_factors(current_tick())[0]
+    heatmap, histogram = build_charts(data_path, data_mtime, job_filter, age_factor)
+
+    # 创建两个列用于显示图表，key 固定以保留图表状态（缩放、悬停等）
+    fig_col1, fig_col2 = st.columns(2)
+    with fig_col1:
+        st.markdown("### First Chart")  # 图表标题
+        st.plotly_chart(heatmap, width="stretch", key="heatmap")
+    with fig_col2:
+        st.markdown("### Second Chart")  # 图表标题
+        st.plotly_chart(histogram, width="stretch", key="histogram")
+
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def live_rows_panel():
+    # 只计算上次刷新之后新到达的记录，追加到本会话的滚动窗口里
+    tick = current_tick()
+    state = st.session_state.get("live_rows")
+    if state is None or state["job"] != job_filter:
+        state = {"job": job_filter, "tick": tick - 1, "rows": job_rows.iloc[:0].assign(age_new=0, balance_new=0)}
+    new_ticks = range(max(state["tick"] + 1, tick - LIVE_ROWS // ROWS_PER_TICK + 1), tick + 1)
+    batches = []
+    for t in new_ticks:
+        age_factor, balance_factor, _ = tick_factors(t)
+        index = np.arange(t * ROWS_PER_TICK, (t + 1) * ROWS_PER_TICK) % len(job_rows)
+        batch = job_rows.iloc[index]
+        batches.append(batch.assign(age_new=batch["age"] * age_factor, balance_new=batch["balance"] * balance_factor))
+    if batches:
+        state["rows"] = pd.concat([state["rows"], *batches]).tail(LIVE_ROWS)
+        state["tick"] = tick
+    st.session_state["live_rows"] = state
+
+    st.markdown("### Live Records")
+    st.dataframe(state["rows"].iloc[::-1], key="live_table")  # 最新的记录在最上面
+
+
+kpi_panel()
+chart_panel()
+live_rows_panel()
+
+# 完整数据表只在切换筛选条件时发送一次，不随实时刷新重复发送
+with st.expander("Detailed Data View"):
+    st.dataframe(job_rows, key="detail_table")
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from rehab import codec, quaternion
+
+
+def random_stream(n, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.cumsum(rng.integers(5, 50, n)) / 1000.0
+    return t, quaternion.normalize(rng.normal(size=(n, 4)))
+
+
+@pytest.mark.parametrize("compress", [False, True])
+def test_round_trip_is_exact_for_timestamps(compress):
+    t, q = random_stream(5000)
+    decoded_t, decoded_q = codec.decode(codec.encode(t, q, block_size=700, compress=compress))
+    assert np.array_equal(decoded_t, t)
+    assert np.array_equal(decoded_q, codec.unpack_quaternions(codec.pack_quaternions(q)))
+
+
+@pytest.mark.parametrize("bits", [4, 6, 8, 10])
+def test_rotation_error_bound(bits):
+    # 三个分量各差不超过半个量化步长，旋转误差不超过 2·√3·步长
+    q = random_stream(20000, bits)[1]
+    decoded = codec.unpack_quaternions(codec.pack_quaternions(q, bits), bits)
+    step = 2 * np.sqrt(0.5) / ((1 << bits) - 2)
+    assert quaternion.angle_between(q, decoded).max() <= 2 * np.sqrt(3) * step
+
+
+def test_sample_recordings_within_0_2_degrees():
+    for path in ["doc/motion_data.csv", "doc/HumeralMonitor1.txt"]:
+        for t, q in codec.convert(path).values():
+            decoded = codec.decode(codec.encode(t, q))[1]
+            assert np.degrees(quaternion.angle_between(quaternion.normalize(q), decoded)).max() < 0.2
+
+
+def test_identity_is_exact():
+    q = np.tile([1.0, 0.0, 0.0, 0.0], (3, 1))
+    assert np.array_equal(codec.unpack_quaternions(codec.pack_quaternions(q)), q)
+
+
+def test_random_access_matches_slice():
+    t, q = random_stream(5000, 1)
+    t[2500:] += 120.0  # 超出 int16 的间隔另起一块
+    reader = codec.Reader(codec.encode(t, q, block_size=512))
+    all_t, all_q = reader.read()
+    assert np.allclose(all_t, t, rtol=0, atol=1e-9)
+    # 端点取原始（未经编码）的时间，两端的样本都应包含在内
+    t0, t1 = t[1234], t[3456]
+    part_t, part_q = reader.read(t0, t1)
+    assert np.array_equal(part_t, all_t[1234:3457])
+    assert np.array_equal(part_q, all_q[1234:3457])
+
+
+def test_empty_stream():
+    reader = codec.Reader(codec.encode(np.empty(0), np.empty((0, 4))))
+    assert len(reader) == 0
+    assert reader.read()[0].shape == (0,)
+
+
+@pytest.mark.parametrize("bits", [1, 11, 16])
+def test_rejects_bits_out_of_range(bits):
+    t, q = random_stream(10)
+    with pytest.raises(ValueError):
+        codec.encode(t, q, bits=bits)
+
+
+def test_rejects_unsorted_timestamps():
+    t, q = random_stream(10)
+    with pytest.raises(ValueError):
+        codec.encode(t[::-1], q)
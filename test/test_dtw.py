@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from rehab import dtw
+
+
+def brute_force(a, b, window):
+    # 逐格计算的带约束 DTW（平方欧氏代价）
+    n = len(a)
+    cost = np.full((n + 1, n + 1), np.inf)
+    cost[0, 0] = 0.0
+    for i in range(1, n + 1):
+        for j in range(max(1, i - window), min(n, i + window) + 1):
+            d = np.sum((a[i - 1] - b[j - 1]) ** 2)
+            cost[i, j] = d + min(cost[i - 1, j], cost[i, j - 1], cost[i - 1, j - 1])
+    return cost[n, n]
+
+
+def random_series(n, d, seed):
+    return np.cumsum(np.random.default_rng(seed).normal(size=(n, d)), axis=0)
+
+
+@pytest.mark.parametrize("n, d, window", [(1, 1, 1), (2, 1, 1), (17, 1, 2), (40, 3, 4), (33, 2, 40)])
+def test_dtw_matches_brute_force(n, d, window):
+    query = random_series(n, d, 0)
+    templates = np.stack([random_series(n, d, seed) for seed in range(1, 6)])
+    expected = [brute_force(query, t, window) for t in templates]
+    assert np.allclose(dtw.dtw_many(query, templates, window), expected)
+    assert np.isclose(dtw.dtw(query, templates[0], window), expected[0])
+
+
+def test_early_abandon_keeps_costs_below_threshold():
+    query = random_series(50, 2, 0)
+    templates = np.stack([random_series(50, 2, seed) for seed in range(1, 20)])
+    exact = dtw.dtw_many(query, templates, 5)
+    threshold = np.median(exact)
+    abandoned = dtw.dtw_many(query, templates, 5, threshold)
+    below = exact <= threshold
+    assert np.allclose(abandoned[below], exact[below])
+    assert np.all(np.isinf(abandoned[~below]) | np.isclose(abandoned[~below], exact[~below]))
+
+
+def test_lb_keogh_is_a_lower_bound():
+    n, window = 64, 6
+    query = random_series(n, 2, 0)
+    for seed in range(1, 30):
+        template = random_series(n, 2, seed)
+        upper, lower = dtw.envelope(template, window)
+        assert dtw.lb_keogh(query, upper, lower) <= brute_force(query, template, window) + 1e-9
+
+
+def test_library_returns_exact_top_k():
+    templates = {f"t{seed}": random_series(300, 1, seed)[:, 0] for seed in range(1, 40)}
+    library = dtw.TemplateLibrary(templates, length=64)
+    query = random_series(200, 1, 0)[:, 0]
+    resampled = dtw.resample(query, 64)
+    exact = sorted((brute_force(resampled, library.series[i], library.window), name)
+                   for i, name in enumerate(library.names))
+    results, stats = library.match(query, k=5)
+    assert [name for name, _ in results] == [name for _, name in exact[:5]]
+    assert np.allclose([d for _, d in results], [dtw.rms(cost, 64) for cost, _ in exact[:5]])
+    assert stats["dtw_runs"] + stats["pruned"] == len(templates)
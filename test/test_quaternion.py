@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from rehab import quaternion
+
+Rotation = pytest.importorskip("scipy.spatial.transform").Rotation
+
+
+def random_quaternions(n, seed=0):
+    return quaternion.normalize(np.random.default_rng(seed).normal(size=(n, 4)))
+
+
+def to_scipy(q):
+    # w-first -> scipy's scalar-last
+    return Rotation.from_quat(q[:, [1, 2, 3, 0]])
+
+
+def test_multiply_matches_scipy():
+    a, b = random_quaternions(500, 1), random_quaternions(500, 2)
+    expected = (to_scipy(a) * to_scipy(b)).as_quat()[:, [3, 0, 1, 2]]
+    product = quaternion.multiply(a, b)
+    # q and -q are the same rotation
+    assert np.allclose(np.abs(quaternion.dot(product, expected)), 1.0)
+
+
+def test_rotate_matches_scipy():
+    q = random_quaternions(500)
+    v = np.random.default_rng(3).normal(size=(500, 3))
+    assert np.allclose(quaternion.rotate(q, v), to_scipy(q).apply(v))
+
+
+def test_slerp_matches_scipy():
+    from scipy.spatial.transform import Slerp
+
+    q0, q1 = random_quaternions(200, 4), random_quaternions(200, 5)
+    t = np.random.default_rng(6).uniform(size=200)
+    ours = quaternion.slerp(q0, q1, t)
+    for i in range(len(t)):
+        # scipy interpolates the short way too, so the rotations agree
+        expected = Slerp([0, 1], to_scipy(np.stack([q0[i], q1[i]])))([t[i]]).as_quat()[0, [3, 0, 1, 2]]
+        assert abs(abs(np.dot(ours[i], expected)) - 1.0) < 1e-9
+
+
+def test_angle_between_matches_scipy():
+    a, b = random_quaternions(500, 7), random_quaternions(500, 8)
+    expected = (to_scipy(a).inv() * to_scipy(b)).magnitude()
+    assert np.allclose(quaternion.angle_between(a, b), expected, atol=1e-6)
+
+
+def test_conjugate_is_inverse():
+    q = random_quaternions(100)
+    identity = quaternion.multiply(q, quaternion.conjugate(q))
+    assert np.allclose(identity, [1.0, 0.0, 0.0, 0.0])
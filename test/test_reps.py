@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from rehab import reps
+
+
+def signals():
+    rng = np.random.default_rng(0)
+    t = np.arange(3000) / 10.0
+    yield "sine", 60 * np.sin(2 * np.pi * t / 4) + rng.normal(0, 3, len(t))
+    for seed in range(8):
+        # 随机游走, 取整后会出现平台段
+        walk = np.cumsum(np.random.default_rng(seed).normal(0, 4, 4000))
+        yield f"walk{seed}", np.round(walk) if seed % 2 else walk
+    yield "flat", np.zeros(50)
+    yield "short", np.array([0.0, 30.0])
+    yield "empty", np.empty(0)
+
+
+def zigzag_loop(angle, threshold):
+    # 逐个候选点喂给 _ZigZag 的参考实现
+    zigzag = reps._ZigZag(threshold)
+    points = {"valley": [], "peak": []}
+    for index in reps._candidates(angle):
+        turned = zigzag.update(index, angle[index])
+        if turned:
+            points[turned[0]].append(turned[1])
+    pending = zigzag.finish()
+    if pending:
+        points[pending[0]].append(pending[1])
+    return points["valley"], points["peak"]
+
+
+@pytest.mark.parametrize("name, angle", list(signals()))
+def test_turning_points_match_zigzag(name, angle):
+    for threshold in (5.0, 20.0):
+        valleys, peaks = reps.turning_points(angle, threshold)
+        expected_valleys, expected_peaks = zigzag_loop(angle, threshold)
+        assert valleys.tolist() == expected_valleys
+        assert peaks.tolist() == expected_peaks
+
+
+@pytest.mark.parametrize("name, angle", list(signals()))
+def test_online_matches_batch(name, angle):
+    batch = reps.detect_reps(angle, rate_hz=10, threshold=20)
+    counter = reps.RepCounter(rate_hz=10, threshold=20)
+    online = [rep for rep in map(counter.update, angle) if rep]
+    final = counter.finish()
+    if final:
+        online.append(final)
+    assert counter.count == len(online) == len(batch["rom"])
+    for field in reps.REP_FIELDS:
+        assert np.allclose([rep[field] for rep in online], batch[field]), field
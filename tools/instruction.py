@@ -1,28 +1,122 @@
 import streamlit as st
-import pandas as pd
 import plotly.graph_objects as go
-import time
+import os
+import numpy as np
+from datetime import datetime
+
+from rehab.figures import imu_animation, imu_snapshot, series_figure
+from rehab import metrics
+from rehab.cache import load_monitor, load_table
+from rehab.ingest import align_streams
+from rehab.kinematics import rotation_angle
+from rehab.lod import Pyramid, budget_for_width
+from rehab.playback import PlaybackClock
+from rehab.progress import ProgressStore
+from rehab.reps import DEFAULT_RATE_HZ, REP_FIELDS, RepCounter, detect_reps, summarize
+from rehab.sessions import SessionStore
+from rehab.stream import DEFAULT_PORT, SampleStore, running_store, start_in_thread
+from rehab.users import UserStore
+from rehab.videos import ClipCache, catalog_version, scan_catalog
 
 # --------------- 视频播放 ---------------- #
 
-# 视频文件列表
-video_files = ["videos/v1.mp4", "videos/v2.mp4", "videos/v3.mp4"]  # 这里可以修改视频数量
+# 视频目录（videos/ 或 videos/manifest.json），跨会话缓存
+@st.cache_resource
+def load_catalog(version):
+    return scan_catalog()
+
+# 视频内容跨会话共享，通过 Streamlit 媒体接口（支持 HTTP Range）提供；每个视频只读一次
+@st.cache_resource
+def get_clip_cache():
+    return ClipCache()
+
+clips = load_catalog(catalog_version())
+
+# 本次训练的动作记录：按 Rotation_Angle 统计重复次数和活动度
+MOTION_FILE = "doc/motion_data.csv"
+
+# IMU 传感器录制文件
+file1_path = "doc/HumeralMonitor1.txt"  # 请修改为实际文件路径
+file2_path = "doc/HumeralMonitor2.txt"
+file3_path = "doc/HumeralMonitor3.txt"
+SENSOR_NAMES = ["HumeralMonitor1", "HumeralMonitor2", "HumeralMonitor3"]
+
+# 完成的训练按患者和日期归档（data/sessions），附带传感器数据和元数据
+@st.cache_resource
+def get_session_store():
+    return SessionStore()
+
+@st.cache_resource
+def get_progress_store():
+    return ProgressStore()
+
+def count_reps(streams):
+    # 取活动范围最大的传感器，用相对第一帧的旋转角逐样本喂给 RepCounter
+    t, angle = max(((s["t"], rotation_angle(s["q"])) for s in streams.values()), key=lambda s: np.ptp(s[1]))
+    dt = np.median(np.diff(t)) if len(t) > 1 else 0.0
+    counter = RepCounter(rate_hz=1.0 / dt if dt > 0 else DEFAULT_RATE_HZ)
+    reps = [rep for rep in map(counter.update, angle) if rep]
+    final = counter.finish()
+    if final:
+        reps.append(final)
+    return counter, summarize({field: np.array([rep[field] for rep in reps]) for field in REP_FIELDS})
+
+def archive_session(username):
+    # 只归档该患者本次训练期间实时传感器采到的数据（仍在环形缓冲区中的部分）；没有采集数据就不归档
+    # 同时把重复次数和活动度写入进度表（医生端的进度表和每日曲线）；返回本次统计
+    store = running_store()
+    started = st.session_state.training_started
+    since = started.hour * 3600 + started.minute * 60 + started.second + started.microsecond / 1e6
+    streams = store.capture(username, since) if store else {}
+    if not streams:
+        return None
+    get_session_store().append(
+        username, streams, started, datetime.now(),
+        exercise=", ".join(c["title"] for c in clips) or None,
+        video_index=st.session_state.video_index, meta={"source": "live"},
+    )
+    counter, summary = count_reps(streams)
+    # 没有完整重复的训练不计入，否则 0° 会拉低活动度趋势
+    if counter.count:
+        get_progress_store().record_session(
+            username, started.date(), counter.count, counter.rom_total / counter.count, counter.rom_max)
+    return summary
+
+@st.cache_data
+def session_summary(path, mtime):
+    return summarize(detect_reps(load_table(path)["Rotation_Angle"]))
 
 # 初始化 session state
 if "video_index" not in st.session_state:
     st.session_state.video_index = 0
 if "completed" not in st.session_state:
     st.session_state.completed = False
+if "training_started" not in st.session_state:
+    st.session_state.training_started = datetime.now()
 
 def next_video():
-    if st.session_state.video_index < len(video_files) - 1:
+    if st.session_state.video_index < len(clips) - 1:
         st.session_state.video_index += 1
     else:
         st.session_state.completed = True
     st.rerun()
 
 # 显示视频
-st.video(video_files[st.session_state.video_index], loop=True)  # 启用循环播放
+if not clips:
+    st.warning("videos/ 目录中没有训练视频。")
+else:
+    clip = clips[min(st.session_state.video_index, len(clips) - 1)]
+    quality = "original"
+    if len(clip["renditions"]) > 1:
+        quality = st.selectbox("画质", list(clip["renditions"]), key="video_quality")
+    st.video(get_clip_cache().get(clip["renditions"][quality]), loop=True)  # 启用循环播放
+
+    # 后台预取下一个视频（已缓存或已在读取时不会重复启动）
+    if st.session_state.video_index + 1 < len(clips):
+        next_clip = clips[st.session_state.video_index + 1]
+        get_clip_cache().prefetch(next_clip["renditions"].get(quality, next_clip["path"]))
+        if next_clip["poster"]:
+            st.image(next_clip["poster"], caption=f"下一个：{next_clip['title']}", width=160)
 
 # 显示按钮
 if not st.session_state.completed:
@@ -32,27 +126,132 @@ else:
     if st.button("Done"):
         st.balloons()
         st.write("### You've completed all of today's training, you're awesome!")
-        
+        if not st.session_state.get("session_recorded") and st.session_state.get("user_data"):
+            st.session_state.live_summary = archive_session(st.session_state.user_data["username"])
+            st.session_state.session_recorded = True
+        summary = st.session_state.get("live_summary")
+        if summary:
+            st.caption("Your session, from the live sensors. Saved to your progress.")
+        else:
+            # 没有实时采集数据时显示示例录制 doc/motion_data.csv 的统计，不属于该患者，不写入进度表
+            summary = session_summary(MOTION_FILE, os.path.getmtime(MOTION_FILE))
+            st.caption("Sample recording: these numbers are for demonstration and are not saved to your progress.")
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Repetitions", summary["reps"])
+        col2.metric("Mean ROM", f"{summary['mean_rom']:.1f}°")
+        col3.metric("Peak velocity", f"{summary['peak_velocity']:.0f}°/s")
+        col4.metric("Mean rep time", f"{summary['mean_duration']:.1f} s")
+
 
 # --------------- 3D 传感器可视化 ---------------- #
 
 st.header("3D IMU Sensor Visualization")
 
-# 读取 IMU 数据（按照文件顺序，而不是按时间合并）
-file1_path = "doc/HumeralMonitor1.txt"  # 请修改为实际文件路径
-file2_path = "doc/HumeralMonitor2.txt"
-file3_path = "doc/HumeralMonitor3.txt"
+# 实时传感器：进程内只启动一个采集服务（rehab.stream），页面直接读取环形缓冲区的最新窗口
+@st.cache_resource
+def live_store():
+    store = SampleStore()
+    start_in_thread(store)
+    return store
+
+@st.cache_resource
+def get_user_store():
+    return UserStore()
+
+def visible_patients():
+    # 患者只能看自己的实时数据，医生只能看自己名下的患者
+    user = st.session_state.get("user_data")
+    if not user:
+        return set()
+    if user["role"] == "Doctor":
+        return set(get_user_store().patients_of(user["username"]))
+    return {user["username"]}
+
+source = st.radio("数据来源", ["录制文件", "实时传感器"], horizontal=True, key="imu_source")
+
+if source == "实时传感器":
+    try:
+        store = live_store()
+    except OSError as e:
+        st.error(f"无法启动传感器采集服务：{e}")
+        st.stop()
+    allowed = visible_patients()
+    patients = [p for p in store.patients() if p in allowed]
+    if not patients:
+        st.info(f"等待传感器连接（TCP 端口 {DEFAULT_PORT}）。可用 `python -m rehab.replay --patient <用户名> doc/HumeralMonitor*.txt` 回放测试。")
+    else:
+        patient = st.selectbox("患者", patients, key="live_patient")
+        sensors = [s for s in store.sensors(patient) if len(store.buffer(patient, s))]
+        latest = [store.window(patient, s, 1)[1][-1, 1:4] for s in sensors]
+        palette = ["red", "blue", "green", "orange", "purple"]
+        colors = [palette[i % len(palette)] for i in range(len(sensors))]
+        metrics.plotly_chart(imu_snapshot(latest, sensors, colors, title="IMU 实时位置"), "imu_live",
+                             width="stretch", key="imu_live")
+    st.button("刷新", key="live_refresh")
+    st.stop()
+
+# 读取 IMU 数据，按时间戳对齐到统一时钟并重采样（四元数球面插值）
+SAMPLE_RATE_HZ = 10.0
+
+@st.cache_resource
+def load_aligned(paths, mtimes, rate_hz):
+    streams = [load_monitor(p) for p in paths]
+    try:
+        return align_streams(streams, rate_hz=rate_hz) + (False,)
+    except ValueError:
+        # 各传感器不是同一时段录制时，按各自起点对齐
+        return align_streams(streams, rate_hz=rate_hz, relative=True) + (True,)
+
+paths = (file1_path, file2_path, file3_path)
+with metrics.stage("load_aligned"):
+    grid, quats, relative_clock = load_aligned(paths, tuple(os.path.getmtime(p) for p in paths), SAMPLE_RATE_HZ)
+points = [q[:, 1:4] for q in quats]  # 每个传感器一段连续的 (N, 3) 数组
+n_samples = len(grid)
+if relative_clock:
+    st.caption("传感器录制时段不重叠，已按各自起始时间对齐。")
 
-df1 = pd.read_csv(file1_path, sep=" ", header=None, names=["Time1", "X1", "Y1", "Z1", "W1"])
-df2 = pd.read_csv(file2_path, sep=" ", header=None, names=["Time2", "X2", "Y2", "Z2", "W2"])
-df3 = pd.read_csv(file3_path, sep=" ", header=None, names=["Time3", "X3", "Y3", "Z3", "W3"])
+SENSOR_COLORS = ["red", "blue", "green"]
 
-# **保证三组数据行数相等**
-min_len = min(len(df1), len(df2), len(df3))
-df1, df2, df3 = df1.iloc[:min_len], df2.iloc[:min_len], df3.iloc[:min_len]  # 截取最短的长度，确保索引一致
+# 四元数时间序列：按图宽决定点数，多分辨率金字塔只取所选时间段
+CHART_WIDTH_PX = 1200
+
+@st.cache_resource
+def load_pyramids(path, mtime):
+    t, q = load_monitor(path)
+    t = t - t[0]
+    return [(name, Pyramid(t, q[:, k])) for k, name in enumerate(["w", "x", "y", "z"])]
+
+with st.expander("四元数时间序列"):
+    sensor = st.selectbox("传感器", SENSOR_NAMES, key="series_sensor")
+    sensor_path = paths[SENSOR_NAMES.index(sensor)]
+    with metrics.stage("load_pyramids"):
+        pyramids = load_pyramids(sensor_path, os.path.getmtime(sensor_path))
+    t_start, t_end = (float(v) for v in pyramids[0][1].x_range)
+    t0, t1 = st.slider("时间范围 (s)", t_start, t_end, (t_start, t_end), key="series_range")
+    with metrics.stage("series_figure"):
+        series_fig = series_figure(pyramids, t0, t1, budget_for_width(CHART_WIDTH_PX), xaxis_title="时间 (s)")
+    metrics.plotly_chart(series_fig, "series_chart", width="stretch", key="series_chart")
+
+# 浏览器端动画：整段序列一次性发送给 Plotly，播放在浏览器中进行，页面脚本立即返回
+@st.cache_data
+def build_imu_animation(streams):
+    fig = imu_animation(streams, SENSOR_NAMES, SENSOR_COLORS, title="IMU 三传感器 3D 位置")
+    return fig.to_dict()
+
+mode = st.radio("播放模式", ["浏览器动画", "服务器逐帧"], horizontal=True, key="imu_playback_mode")
+
+if mode == "浏览器动画":
+    with metrics.stage("build_imu_animation"):
+        fig_dict = build_imu_animation(points)
+    metrics.plotly_chart(fig_dict, "imu_animation", width="stretch", key="imu_animation")
+    st.stop()
+
+# 按录制时间戳播放：渲染跟不上时跳帧而不是排队，每个会话限制刷新率，同时观看的人越多单人帧率越低
+speed = st.select_slider("播放速度", options=[0.5, 1.0, 2.0, 4.0], value=1.0, key="imu_playback_speed")
 
 # **唯一** 3D 图表占位符
 chart_placeholder = st.empty()
+stats_placeholder = st.empty()
 
 # 设定坐标轴范围，防止缩放跳动
 x_range = [-1, 1]
@@ -60,10 +259,18 @@ y_range = [-1, 1]
 z_range = [-1, 1]
 
 # **模拟实时数据流**
-for index in range(min_len):
-    latest_x1, latest_y1, latest_z1 = df1.iloc[index][["X1", "Y1", "Z1"]]
-    latest_x2, latest_y2, latest_z2 = df2.iloc[index][["X2", "Y2", "Z2"]]
-    latest_x3, latest_y3, latest_z3 = df3.iloc[index][["X3", "Y3", "Z3"]]
+clock = PlaybackClock(grid, speed=speed)
+
+def show_playback_stats(finished=False):
+    stats = clock.stats()
+    status = "播放结束" if finished else f"当前观看 {stats['viewers']} 人"
+    stats_placeholder.caption(f"{stats['fps']:.1f} fps，已跳过 {stats['dropped']} 帧，"
+                              f"平均延迟 {stats['mean_lag'] * 1000:.0f} ms，{status}")
+
+for index in clock.frames():
+    latest_x1, latest_y1, latest_z1 = points[0][index]
+    latest_x2, latest_y2, latest_z2 = points[1][index]
+    latest_x3, latest_y3, latest_z3 = points[2][index]
     time_key = index  # 用索引作为唯一 Key，保证顺序不变
 
     # **创建 3D 轨迹图**
@@ -117,7 +324,11 @@ for index in range(min_len):
     )
 
     # ✅ **使用 `index` 作为 key，确保唯一 ID（按顺序）**
-    chart_placeholder.plotly_chart(fig, use_container_width=True, key=f"plotly_chart_{time_key}")
+    metrics.plotly_chart(fig, "imu_stream", chart_placeholder, width="stretch", key=f"plotly_chart_{time_key}")
+
+    # **播放统计**（每 10 帧更新一次）
+    if clock.rendered and clock.rendered % 10 == 0:
+        show_playback_stats()
 
-    # **控制更新频率**
-    time.sleep(0.1)
+# 播放结束后显示最终统计
+show_playback_stats(finished=True)
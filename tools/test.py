@@ -1,96 +1,144 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-import plotly.graph_objects as go
-from scipy.spatial.transform import Rotation as R
+import os
+import glob
+
+from rehab import jobs, metrics
+from rehab.dtw import TemplateLibrary
+from rehab.figures import arm_figure, arm_frames, series_figure
+from rehab.kinematics import load_motion, motion_quaternions, motion_segments, rotation_angle, segment_directions
+from rehab.lod import Pyramid, budget_for_width
+from rehab.sessions import SessionStore
 
 st.set_page_config(page_title="3D Vector Animation", layout="wide")
 st.title("🦴 Arm Vector Animation (Forward & Reverse)")
 
 # 读取数据
-df = pd.read_csv("doc/motion_data.csv")
-max_frame = len(df)
+MOTION_FILE = "doc/motion_data.csv"
 axis_range = [-1.5, 1.5]
 
-def swap_yz(v):
-    return np.array([v[0], v[2], v[1]])
+# 按录制文件缓存运动学结果（文件修改后自动失效），所有会话共享同一份只读数组
+@st.cache_resource
+def load_segments(path, mtime):
+    P1, P2 = motion_segments(load_motion(path))
+    P1.flags.writeable = False
+    P2.flags.writeable = False
+    return P1, P2
+
+with metrics.stage("load_segments"):
+    P1_all, P2_all = load_segments(MOTION_FILE, os.path.getmtime(MOTION_FILE))
 
-# 生成帧序列的函数（支持正序和倒序）
-def generate_frames(reverse=False):
+# 正放/倒放共用一个图：帧里只带变化的坐标，倒放是按反向帧名播放
+# 在后台任务中生成，同一录制文件的任务所有会话共享，生成期间页面其余部分可正常操作
+# 帧分块生成（占绝大部分耗时），每块之间汇报进度并检查是否已取消
+FRAME_CHUNK = 200
+
+def build_arm_figure(job, P1, P2):
     frames = []
-    indices = range(max_frame)
-    if reverse:
-        indices = reversed(indices)
-
-    for i in indices:
-        h_q = df.loc[i, ["Humerus_w", "Humerus_x", "Humerus_y", "Humerus_z"]].to_numpy()
-        r_q = df.loc[i, ["Radius_w", "Radius_x", "Radius_y", "Radius_z"]].to_numpy()
-
-        h_rot = R.from_quat([h_q[1], h_q[2], h_q[3], h_q[0]])
-        r_rot = R.from_quat([r_q[1], r_q[2], r_q[3], r_q[0]])
-
-        radius_dir = swap_yz(r_rot.apply([1, 0, 0]))
-        humerus_dir = swap_yz(h_rot.apply([1, 0, 0]))
-
-        O = np.array([0, 0, 0])
-        P1 = radius_dir
-        P2 = P1 + humerus_dir
-
-        frame_data = [
-            go.Scatter3d(x=[O[0]], y=[O[1]], z=[O[2]],
-                         mode='markers',
-                         marker=dict(size=4, color='black'),
-                         name="Origin"),
-            go.Scatter3d(x=[O[0], P1[0]], y=[O[1], P1[1]], z=[O[2], P1[2]],
-                         mode='lines+markers',
-                         marker=dict(size=4, color='red'),
-                         line=dict(color='red', width=5),
-                         name="Radius (Upper Arm)"),
-            go.Scatter3d(x=[P1[0], P2[0]], y=[P1[1], P2[1]], z=[P1[2], P2[2]],
-                         mode='lines+markers',
-                         marker=dict(size=4, color='blue'),
-                         line=dict(color='blue', width=5),
-                         name="Humerus (Forearm)")
-        ]
-        frames.append(go.Frame(data=frame_data, name=str(i)))
-    return frames
-
-# 生成两个动画：正序 & 倒序
-frames_forward = generate_frames(reverse=False)
-frames_reverse = generate_frames(reverse=True)
-
-def build_figure(frames, title):
-    return go.Figure(
-        data=frames[0].data,
-        layout=go.Layout(
-            title=title,
-            scene=dict(
-                xaxis=dict(title='X', range=axis_range),
-                yaxis=dict(title='Y (Up)', range=axis_range),
-                zaxis=dict(title='Z', range=axis_range),
-                aspectmode="cube"
-            ),
-            updatemenus=[dict(
-                type="buttons",
-                showactive=False,
-                buttons=[
-                    dict(label="▶ Play", method="animate", args=[None, {
-                        "frame": {"duration": 100, "redraw": True},
-                        "fromcurrent": True}]),
-                    dict(label="⏸ Pause", method="animate", args=[[None], {
-                        "frame": {"duration": 0, "redraw": False},
-                        "mode": "immediate"}])
-                ]
-            )]
-        ),
-        frames=frames
-    )
-
-# 并列显示两个图
-col1, col2 = st.columns(2)
-
-with col1:
-    st.plotly_chart(build_figure(frames_forward, "Forward Animation"), use_container_width=True)
-
-with col2:
-    st.plotly_chart(build_figure(frames_reverse, "Reverse Animation"), use_container_width=True)
+    for start in range(0, len(P1), FRAME_CHUNK):
+        job.check()
+        job.report(start / len(P1), message=f"生成动画帧 {start}/{len(P1)}")
+        frames += arm_frames(P1[start:start + FRAME_CHUNK], P2[start:start + FRAME_CHUNK], offset=start)
+    job.check()
+    fig = arm_figure(P1, P2, "Arm Animation", axis_range, frames=frames)
+    # 返回 Figure 而不是 dict：结果在会话间共享，Plotly 校验 dict 时会临时改动它，多线程下不安全
+    return fig
+
+mtime = os.path.getmtime(MOTION_FILE)
+arm_job = jobs.run("arm_figure", build_arm_figure, P1_all, P2_all, inputs=(MOTION_FILE, mtime))
+if arm_job.status == "done":
+    metrics.plotly_chart(arm_job.result(), "arm_animation", width="stretch")
+elif arm_job.status == "failed":
+    st.error(f"动画生成失败：{arm_job.future.exception()}")
+else:
+    # 只轮询这个片段，完成后整页重跑一次显示图表
+    @st.fragment(run_every=0.5)
+    def arm_progress():
+        if arm_job.done():
+            st.rerun()
+        st.progress(arm_job.progress, text=arm_job.message or "排队中")
+    arm_progress()
+
+# 旋转角时间序列：按图宽抽稀，拖动时间范围时只取该段的细节
+RATE_HZ = 10.0
+CHART_WIDTH_PX = 1600
+
+@st.cache_resource
+def load_angle_pyramid(path, mtime):
+    angle = load_motion(path)["Rotation_Angle"]
+    return Pyramid(np.arange(len(angle)) / RATE_HZ, angle)
+
+with metrics.stage("load_angle_pyramid"):
+    angle_pyramid = load_angle_pyramid(MOTION_FILE, os.path.getmtime(MOTION_FILE))
+t_start, t_end = (float(v) for v in angle_pyramid.x_range)
+t0, t1 = st.slider("时间范围 (s)", t_start, t_end, (t_start, t_end), key="angle_range")
+with metrics.stage("series_figure"):
+    angle_fig = series_figure([("Rotation_Angle", angle_pyramid)], t0, t1, budget_for_width(CHART_WIDTH_PX),
+                              title="Rotation Angle", xaxis_title="Time (s)", yaxis_title="Angle (°)")
+metrics.plotly_chart(angle_fig, "angle_series", width="stretch")
+
+# 与参考动作比较：患者的轨迹与模板库做带约束的 DTW 匹配（模板放在 data/templates/*.csv，格式同 motion_data.csv）
+# 实时传感器只发送四元数，所以模板和患者录制都从四元数流算特征：取活动范围最大的一路（模板为 Humerus/Radius 之一）
+TEMPLATE_DIR = os.environ.get("REHAB_TEMPLATE_DIR", "data/templates")
+FEATURES = {
+    "旋转角": rotation_angle,
+    "传感器方向": segment_directions,
+}
+
+def most_active(quats):
+    # {name: (N, 4) 四元数} -> 旋转范围最大的一路
+    return max(quats.values(), key=lambda q: np.ptp(rotation_angle(q)))
+
+@st.cache_resource
+def get_session_store():
+    return SessionStore()
+
+# 模板库按文件和特征缓存，包络线只算一次
+@st.cache_resource
+def load_library(files, feature):
+    return TemplateLibrary({
+        os.path.splitext(os.path.basename(path))[0]: FEATURES[feature](most_active(motion_quaternions(load_motion(path))))
+        for path, _ in files
+    })
+
+def same_file(a, b):
+    return os.path.exists(a) and os.path.exists(b) and os.path.samefile(a, b)
+
+st.subheader("Compare with Reference Exercises")
+template_paths = sorted(glob.glob(os.path.join(TEMPLATE_DIR, "*.csv")))
+if not template_paths:
+    st.info(f"{TEMPLATE_DIR}/ 中没有参考动作模板（*.csv，格式同 motion_data.csv），暂不能比较。")
+else:
+    feature = st.radio("比较特征", list(FEATURES), horizontal=True, key="dtw_feature")
+
+    # 待比较的录制：登录患者最近归档的实时训练（每个传感器的四元数流），或示例录制
+    # 早期把示例文件当作训练归档的记录没有 source，不会出现在这里
+    recordings = {"示例录制 (doc/motion_data.csv)": None}
+    user = st.session_state.get("user_data")
+    if user and user.get("role") == "Patient":
+        store = get_session_store()
+        for session in reversed(store.recent(user["username"], days=30)):
+            meta = store.meta(session)
+            if meta.get("source") == "live" and any("q" in columns for columns in meta.get("streams", {}).values()):
+                recordings[f"{session['start']:%Y-%m-%d %H:%M} ({session['exercise'] or '训练'})"] = session
+    choice = st.selectbox("录制", list(recordings), key="dtw_recording")
+    session = recordings[choice]
+    if session is None:
+        query = most_active(motion_quaternions(load_motion(MOTION_FILE)))
+        # 示例录制本身也在模板目录里时不参与比较，否则总是和自己匹配
+        candidates = [p for p in template_paths if not same_file(p, MOTION_FILE)]
+    else:
+        query = most_active({name: np.asarray(columns["q"]) for name, columns in get_session_store().load(session).items()
+                             if "q" in columns})
+        candidates = template_paths
+
+    if not candidates:
+        st.info("除示例录制本身外没有其他模板可比较。")
+    else:
+        with metrics.stage("dtw.match"):
+            library = load_library(tuple((p, os.path.getmtime(p)) for p in candidates), feature)
+            results, stats = library.match(FEATURES[feature](query), k=min(10, len(library.names)))
+        st.dataframe({"Template": [name for name, _ in results], "DTW distance (RMS)": [round(d, 3) for _, d in results]},
+                     width="stretch")
+        st.caption(f"{stats['templates']} 个模板，完整 DTW {stats['dtw_runs']} 次，"
+                   f"下界剪枝 {stats['pruned']} 个，提前终止 {stats['abandoned']} 个")